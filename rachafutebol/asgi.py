@@ -3,6 +3,12 @@ ASGI config for rachafutebol project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+O dashboard ao vivo do admin (server-sent events) mantém conexões abertas:
+sirva por aqui, com workers assíncronos, para que cada uma custe só uma
+corrotina em vez de um worker inteiro:
+
+    gunicorn rachafutebol.asgi:application -k uvicorn.workers.UvicornWorker
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
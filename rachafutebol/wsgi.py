@@ -3,6 +3,9 @@ WSGI config for rachafutebol project.
 
 It exposes the WSGI callable as a module-level variable named ``application``.
 
+Servido por aqui (runserver, gunicorn rachafutebol.wsgi), o dashboard do admin
+não recebe os números ao vivo: o stream SSE só é aberto no ASGI (ver asgi.py).
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
 """
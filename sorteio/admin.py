@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import Votante, Jogador, Avaliacao
+from . import cache
+from .models import Votante, Jogador, Avaliacao, Rodada, ResumoRodadaJogador, RestricaoPar
 
 class VotanteAdmin(UserAdmin):
     list_display = ('username', 'nome_completo', 'is_superuser', 'date_joined')
@@ -18,25 +19,83 @@ class VotanteAdmin(UserAdmin):
     )
 
 class JogadorAdmin(admin.ModelAdmin):
-    list_display = ('nome', 'ativo', 'data_cadastro', 'get_total_votos', 'get_media_avaliacoes')
-    list_filter = ('ativo', 'data_cadastro')
+    list_display = (
+        'nome', 'ativo', 'data_cadastro', 'get_total_votos', 'get_media_avaliacoes', 'get_media_recente', 'posicao',
+    )
+    list_filter = ('ativo', 'posicao', 'data_cadastro')
     search_fields = ('nome',)
     ordering = ('nome',)
+    actions = ('ativar_jogadores', 'desativar_jogadores')
+    
+    def get_queryset(self, request):
+        # Contagem e média anotadas na própria consulta da listagem
+        return super().get_queryset(request).com_medias()
     
     def get_total_votos(self, obj):
         return obj.total_votos
     get_total_votos.short_description = 'Total de Votos'
+    get_total_votos.admin_order_field = 'count_votos'
     
     def get_media_avaliacoes(self, obj):
         return f"{obj.media_avaliacoes:.1f}" if obj.media_avaliacoes else "0.0"
     get_media_avaliacoes.short_description = 'Média das Avaliações'
+    get_media_avaliacoes.admin_order_field = 'media_notas'
+    
+    def get_media_recente(self, obj):
+        return f"{obj.media_recente:.1f}" if obj.media_recente else "0.0"
+    get_media_recente.short_description = 'Média Recente'
+    get_media_recente.admin_order_field = 'media_recente'
+    
+    @admin.action(description='Ativar jogadores selecionados')
+    def ativar_jogadores(self, request, queryset):
+        total = queryset.definir_ativo(True)
+        self.message_user(request, f'Jogadores ativados: {total}.')
+    
+    @admin.action(description='Desativar jogadores selecionados')
+    def desativar_jogadores(self, request, queryset):
+        total = queryset.definir_ativo(False)
+        self.message_user(request, f'Jogadores desativados: {total}.')
+    
+    def delete_queryset(self, request, queryset):
+        # Um sinal por jogador apagado, mas uma só invalidação do sorteio
+        with cache.em_lote():
+            super().delete_queryset(request, queryset)
 
 class AvaliacaoAdmin(admin.ModelAdmin):
-    list_display = ('avaliador', 'jogador', 'nota', 'data_avaliacao')
-    list_filter = ('nota', 'data_avaliacao')
+    list_display = ('avaliador', 'jogador', 'nota', 'rodada', 'data_avaliacao')
+    list_filter = ('nota', 'rodada')
     search_fields = ('avaliador__nome_completo', 'jogador__nome')
     ordering = ('-data_avaliacao',)
+    
+    def delete_queryset(self, request, queryset):
+        with cache.em_lote():
+            super().delete_queryset(request, queryset)
 
 admin.site.register(Votante, VotanteAdmin)
 admin.site.register(Jogador, JogadorAdmin)
-admin.site.register(Avaliacao, AvaliacaoAdmin)
\ No newline at end of file
+class RodadaAdmin(admin.ModelAdmin):
+    list_display = ('dia', 'arquivada')
+    list_filter = ('arquivada',)
+    ordering = ('-dia',)
+
+class ResumoRodadaJogadorAdmin(admin.ModelAdmin):
+    list_display = ('rodada', 'jogador', 'total_votos', 'get_media', 'nota_minima', 'nota_maxima')
+    list_filter = ('rodada',)
+    list_select_related = ('jogador',)
+    search_fields = ('jogador__nome',)
+
+    def get_media(self, obj):
+        return f"{obj.media:.1f}"
+    get_media.short_description = 'Média'
+
+class RestricaoParAdmin(admin.ModelAdmin):
+    list_display = ('jogador_a', 'tipo', 'jogador_b')
+    list_filter = ('tipo',)
+    list_select_related = ('jogador_a', 'jogador_b')
+    search_fields = ('jogador_a__nome', 'jogador_b__nome')
+    autocomplete_fields = ('jogador_a', 'jogador_b')
+
+admin.site.register(Avaliacao, AvaliacaoAdmin)
+admin.site.register(RestricaoPar, RestricaoParAdmin)
+admin.site.register(Rodada, RodadaAdmin)
+admin.site.register(ResumoRodadaJogador, ResumoRodadaJogadorAdmin)
\ No newline at end of file
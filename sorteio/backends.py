@@ -0,0 +1,81 @@
+"""Backend de autenticação que evita buscar o votante no banco a cada requisição.
+
+Guarda no cache um snapshot enxuto do Votante (id, username, nome_completo e
+as flags de permissão) junto com o hash de sessão já calculado. request.user
+é montado a partir dele com os demais campos adiados: qualquer outro campo só
+é buscado no banco se algum código realmente o acessar. O snapshot é apagado
+sempre que o Votante é salvo ou removido (ver signals.py).
+
+Só vale com um cache compartilhado entre os processos (db, file, redis...):
+num cache local, apagar o snapshot num worker deixaria a cópia dos outros
+aceitando a senha antiga ou um admin rebaixado até expirar. Com o locmem o
+backend se comporta como o ModelBackend.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+CAMPOS_SNAPSHOT = ('id', 'username', 'nome_completo', 'is_superuser', 'is_staff', 'is_active')
+TEMPO_SNAPSHOT = 300
+
+
+def _cache():
+    return caches[getattr(settings, 'SORTEIO_CACHE_ALIAS', 'default')]
+
+
+def compartilhado():
+    """Se o cache do snapshot é visto por todos os processos"""
+    return not isinstance(_cache(), (LocMemCache, DummyCache))
+
+
+def _chave(user_id):
+    return f'sorteio:votante:{user_id}'
+
+
+def guardar_snapshot(user):
+    if not compartilhado():
+        return
+    snapshot = {campo: getattr(user, campo) for campo in CAMPOS_SNAPSHOT}
+    snapshot['hash_sessao'] = user.get_session_auth_hash()
+    _cache().set(_chave(user.pk), snapshot, timeout=TEMPO_SNAPSHOT)
+
+
+def carregar_snapshot(user_id):
+    snapshot = _cache().get(_chave(user_id))
+    if snapshot is None:
+        return None
+    modelo = get_user_model()
+    # from_db espera os valores na ordem dos campos do modelo
+    campos = [f.attname for f in modelo._meta.concrete_fields if f.attname in snapshot]
+    user = modelo.from_db('default', campos, [snapshot[campo] for campo in campos])
+    user.hash_sessao = snapshot['hash_sessao']
+    return user
+
+
+def invalidar_snapshot(user_id):
+    # Apaga já e de novo no commit, para não sobrar um snapshot lido antes da gravação
+    _cache().delete(_chave(user_id))
+    transaction.on_commit(lambda: _cache().delete(_chave(user_id)))
+
+
+class VotanteCacheBackend(ModelBackend):
+    """ModelBackend que resolve request.user a partir do snapshot em cache"""
+    def get_user(self, user_id):
+        if not compartilhado():
+            return super().get_user(user_id)
+        user = carregar_snapshot(user_id)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                guardar_snapshot(user)
+            return user
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        # O ModelBackend consultaria o banco direto nas views assíncronas
+        return await sync_to_async(self.get_user)(user_id)
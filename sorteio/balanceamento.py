@@ -0,0 +1,689 @@
+"""Motor de balanceamento de times.
+
+Cada estratégia recebe a lista de notas (uma por jogador) e o número de times,
+e devolve uma lista de times, cada um com os índices dos jogadores. Os tamanhos
+dos times diferem em no máximo um jogador; o objetivo é minimizar a diferença
+entre a maior e a menor média de time.
+"""
+import logging
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, wait
+from itertools import accumulate
+from multiprocessing import get_context
+
+logger = logging.getLogger('sorteio.balanceamento')
+
+LIMITE_EXATO = 64
+# Nós visitados pelo branch-and-bound antes de ficar com a melhor solução achada
+LIMITE_NOS_EXATO = 3000
+
+
+def tamanhos_dos_times(total, num_times):
+    """Tamanhos o mais iguais possível (os primeiros times recebem as sobras)"""
+    base, extras = divmod(total, num_times)
+    return [base + (1 if i < extras else 0) for i in range(num_times)]
+
+
+def avaliar(valores, times):
+    """Retorna (diferença entre médias, diferença entre tamanhos) de uma divisão"""
+    medias = [sum(valores[i] for i in time) / len(time) for time in times if time]
+    tamanhos = [len(time) for time in times]
+    spread = max(medias) - min(medias) if medias else 0.0
+    return spread, max(tamanhos) - min(tamanhos)
+
+
+def _ordem_decrescente(valores):
+    return sorted(range(len(valores)), key=lambda i: (-valores[i], i))
+
+
+def serpentina(valores, num_times, **opcoes):
+    """Distribuição em serpentina: ida 0..k-1, volta k-1..0"""
+    times = [[] for _ in range(num_times)]
+    for posicao, indice in enumerate(_ordem_decrescente(valores)):
+        ciclo, resto = divmod(posicao, num_times)
+        time_index = resto if ciclo % 2 == 0 else num_times - 1 - resto
+        times[time_index].append(indice)
+    return times
+
+
+def _inicial_guloso(valores, num_times):
+    """Cada jogador vai para o time de menor soma que ainda tem vaga"""
+    capacidades = tamanhos_dos_times(len(valores), num_times)
+    times = [[] for _ in range(num_times)]
+    somas = [0.0] * num_times
+    for indice in _ordem_decrescente(valores):
+        livres = [t for t in range(num_times) if len(times[t]) < capacidades[t]]
+        destino = min(livres, key=lambda t: (somas[t] / capacidades[t], t))
+        times[destino].append(indice)
+        somas[destino] += valores[indice]
+    return times
+
+
+def _melhor_troca(valores, time_a, time_b, soma_a, soma_b):
+    """Par (x em a, y em b) cuja troca mais aproxima as médias de a e b.
+
+    A diferença das médias após trocar x por y é (m_a - m_b) - (x - y) * (1/n_a + 1/n_b),
+    então buscamos x - y o mais próximo possível de d_alvo. Com os valores de b
+    ordenados, cada x de a é resolvido com uma busca binária: O(n log n) por par.
+    """
+    n_a, n_b = len(time_a), len(time_b)
+    fator = 1 / n_a + 1 / n_b
+    d_alvo = (soma_a / n_a - soma_b / n_b) / fator
+    ordenados_b = sorted(time_b, key=lambda j: valores[j])
+    valores_b = [valores[j] for j in ordenados_b]
+    melhor = None
+    for posicao_a, i in enumerate(time_a):
+        alvo = valores[i] - d_alvo
+        k = bisect_left(valores_b, alvo)
+        for candidato in (k - 1, k):
+            if 0 <= candidato < n_b:
+                erro = abs(valores[i] - valores_b[candidato] - d_alvo)
+                if melhor is None or erro < melhor[0]:
+                    melhor = (erro, posicao_a, ordenados_b[candidato])
+    return melhor
+
+
+def _busca_local(valores, times, tempo_limite=None):
+    """Trocas par-a-par entre times enquanto a variância das médias diminuir"""
+    inicio = time.perf_counter()
+    somas = [sum(valores[i] for i in time) for time in times]
+    ativos = [t for t in range(len(times)) if times[t]]
+    media_geral = sum(somas) / max(sum(len(t) for t in times), 1)
+
+    def custo(soma, tamanho):
+        return (soma / tamanho - media_geral) ** 2
+
+    melhorou = True
+    while melhorou:
+        melhorou = False
+        for posicao, a in enumerate(ativos):
+            for b in ativos[posicao + 1:]:
+                if tempo_limite is not None and time.perf_counter() - inicio > tempo_limite:
+                    return times
+                resultado = _melhor_troca(valores, times[a], times[b], somas[a], somas[b])
+                if resultado is None:
+                    continue
+                _, posicao_a, j = resultado
+                i = times[a][posicao_a]
+                delta = valores[i] - valores[j]
+                n_a, n_b = len(times[a]), len(times[b])
+                antes = custo(somas[a], n_a) + custo(somas[b], n_b)
+                depois = custo(somas[a] - delta, n_a) + custo(somas[b] + delta, n_b)
+                if depois < antes - 1e-12:
+                    times[a][posicao_a] = j
+                    times[b][times[b].index(j)] = i
+                    somas[a] -= delta
+                    somas[b] += delta
+                    melhorou = True
+    return times
+
+
+def guloso(valores, num_times, tempo_limite=None, **opcoes):
+    """Distribuição gulosa seguida de busca local por trocas"""
+    return _busca_local(valores, _inicial_guloso(valores, num_times), tempo_limite)
+
+
+def exato(valores, num_times, limite_nos=None, tempo_limite=0.25, **opcoes):
+    """Branch-and-bound sobre a solução gulosa, limitado por número de nós.
+
+    Os jogadores são atribuídos em ordem decrescente de nota. Para cada time, a
+    soma final fica entre a soma atual mais as menores e as maiores notas ainda
+    livres; e como a média geral está sempre entre a menor e a maior média de
+    time, a diferença também é pelo menos a distância de cada um desses limites
+    até ela. O ramo é podado quando esse limite não supera a melhor solução.
+    Times vazios (ou com a mesma soma, contagem e capacidade) são trocáveis
+    entre si, então só um deles é aberto em cada nó.
+
+    A busca para ao provar o ótimo ou ao visitar limite_nos nós (LIMITE_NOS_EXATO):
+    o resultado é o mesmo em qualquer máquina. tempo_limite é só uma rede de
+    segurança. Acima de LIMITE_EXATO jogadores devolve direto a solução gulosa.
+    """
+    total = len(valores)
+    if total == 0:
+        return [[] for _ in range(num_times)]
+    if total > LIMITE_EXATO:
+        return guloso(valores, num_times)
+    limite_nos = LIMITE_NOS_EXATO if limite_nos is None else limite_nos
+    ordem = _ordem_decrescente(valores)
+    notas = [valores[i] for i in ordem]
+    prefixo = [0.0] + list(accumulate(notas))
+    capacidades = tamanhos_dos_times(total, num_times)
+    # Com menos jogadores que times, os times sem vaga ficam fora das médias
+    ativos = [t for t in range(num_times) if capacidades[t]]
+    media_geral = prefixo[total] / total
+
+    melhor_times = guloso(valores, num_times)
+    melhor = [avaliar(valores, melhor_times)[0]]
+    atribuicao = [0] * total
+    somas = [0.0] * num_times
+    contagens = [0] * num_times
+    prazo = time.perf_counter() + tempo_limite if tempo_limite is not None else None
+    nos = [0]
+
+    def limite_inferior(proximo):
+        maior_minimo = media_geral
+        menor_maximo = media_geral
+        for t in ativos:
+            vagas = capacidades[t] - contagens[t]
+            # Maiores notas livres estão logo após 'proximo'; as menores, no fim
+            maximo = somas[t] + prefixo[proximo + vagas] - prefixo[proximo]
+            minimo = somas[t] + prefixo[total] - prefixo[total - vagas]
+            maior_minimo = max(maior_minimo, minimo / capacidades[t])
+            menor_maximo = min(menor_maximo, maximo / capacidades[t])
+        return maior_minimo - menor_maximo
+
+    def buscar(proximo):
+        nos[0] += 1
+        if nos[0] > limite_nos:
+            raise _Esgotado
+        if prazo is not None and nos[0] % 1024 == 0 and time.perf_counter() > prazo:
+            raise _Esgotado
+        if proximo == total:
+            medias = [somas[t] / capacidades[t] for t in ativos]
+            spread = max(medias) - min(medias)
+            if spread < melhor[0] - 1e-12:
+                melhor[0] = spread
+                novos = [[] for _ in range(num_times)]
+                for posicao, t in enumerate(atribuicao):
+                    novos[t].append(ordem[posicao])
+                melhor_times[:] = novos
+            return
+        if limite_inferior(proximo) >= melhor[0] - 1e-12:
+            return
+        vistos = set()
+        for t in sorted(ativos, key=lambda t: (somas[t] / capacidades[t], t)):
+            if contagens[t] >= capacidades[t]:
+                continue
+            # Times com a mesma soma, contagem e capacidade são simétricos
+            chave = (somas[t], contagens[t], capacidades[t])
+            if chave in vistos:
+                continue
+            vistos.add(chave)
+            atribuicao[proximo] = t
+            somas[t] += notas[proximo]
+            contagens[t] += 1
+            buscar(proximo + 1)
+            somas[t] -= notas[proximo]
+            contagens[t] -= 1
+
+    try:
+        buscar(0)
+    except _Esgotado:
+        pass
+    return melhor_times
+
+
+class _Esgotado(Exception):
+    pass
+
+
+class Restricoes:
+    """Restrições do sorteio sobre os índices dos jogadores.
+
+    posicoes: uma por jogador ('' = sem posição); cada posição é espalhada entre
+    os times, com contagens que diferem em no máximo um (tantos goleiros quanto
+    times dá um goleiro por time). separar/juntar: pares (i, j) que devem ficar
+    em times diferentes ou no mesmo time.
+    """
+    def __init__(self, posicoes=(), separar=(), juntar=()):
+        self.posicoes = list(posicoes)
+        self.separar = [tuple(par) for par in separar]
+        self.juntar = [tuple(par) for par in juntar]
+
+    def __bool__(self):
+        return bool(self.separar or self.juntar or any(self.posicoes))
+
+    def pares(self):
+        return [('separar', *par) for par in self.separar] + [('juntar', *par) for par in self.juntar]
+
+    def com_pares(self, pares):
+        return Restricoes(
+            self.posicoes,
+            [par for tipo, *par in pares if tipo == 'separar'],
+            [par for tipo, *par in pares if tipo == 'juntar'],
+        )
+
+
+LIMITE_NOS = 20000
+
+
+def _grupos(total, juntar):
+    """Jogadores que precisam ficar no mesmo time, unidos pelos pares 'juntar'"""
+    pai = list(range(total))
+
+    def raiz(i):
+        while pai[i] != i:
+            pai[i] = pai[pai[i]]
+            i = pai[i]
+        return i
+
+    for a, b in juntar:
+        pai[raiz(a)] = raiz(b)
+    grupos = {}
+    for i in range(total):
+        grupos.setdefault(raiz(i), []).append(i)
+    return list(grupos.values())
+
+
+def _montar(valores, num_times, restricoes, prazo, aleatorio=None):
+    """Busca em profundidade por uma divisão que cumpra todas as restrições.
+
+    Atribui um grupo por vez, dos mais restritos (pares, posições escassas) para
+    os demais; sem 'aleatorio', dos de maior nota para os de menor, cada um no
+    time de menor média. Um ramo é cortado assim que um grupo em conflito fica
+    sem time possível ou uma posição deixa de caber nas vagas que sobram.
+    Retorna os times, ou None se não houver divisão. Se o prazo ou LIMITE_NOS
+    acabarem antes de decidir, levanta _Esgotado.
+    """
+    total = len(valores)
+    capacidades = tamanhos_dos_times(total, num_times)
+    grupos = _grupos(total, restricoes.juntar)
+    if any(len(grupo) > capacidades[0] for grupo in grupos):
+        return None
+    grupo_de = {i: g for g, grupo in enumerate(grupos) for i in grupo}
+    conflitos = [set() for _ in grupos]
+    for a, b in restricoes.separar:
+        if grupo_de[a] == grupo_de[b]:
+            return None
+        conflitos[grupo_de[a]].add(grupo_de[b])
+        conflitos[grupo_de[b]].add(grupo_de[a])
+
+    posicoes = restricoes.posicoes or [''] * total
+    # Cada time tem 'base' jogadores da posição; só 'extras' times podem ter um a mais
+    limites = {p: divmod(n, num_times) for p, n in Counter(p for p in posicoes if p).items()}
+    posicoes_do_grupo = [Counter(posicoes[i] for i in grupo if posicoes[i]) for grupo in grupos]
+
+    time_do_grupo = [None] * len(grupos)
+    somas = [0.0] * num_times
+    vagas = list(capacidades)
+    contagens = [Counter() for _ in range(num_times)]
+    faltando = Counter(p for p in posicoes if p)
+    com_extra = Counter()
+
+    def cabe(g, t):
+        if len(grupos[g]) > vagas[t]:
+            return False
+        if any(time_do_grupo[outro] == t for outro in conflitos[g]):
+            return False
+        for p, n in posicoes_do_grupo[g].items():
+            base, extras = limites[p]
+            depois = contagens[t][p] + n
+            if depois > base + (1 if extras else 0):
+                return False
+            if depois == base + 1 and contagens[t][p] <= base and com_extra[p] >= extras:
+                return False
+        return True
+
+    def posicoes_cabem():
+        for p, (base, extras) in limites.items():
+            if faltando[p] > sum(min(vagas[t], max(base - contagens[t][p], 0)) for t in range(num_times)) + extras - com_extra[p]:
+                return False
+        # Cada time ainda precisa receber o mínimo ('base') de cada posição
+        for t in range(num_times):
+            if sum(max(base - contagens[t][p], 0) for p, (base, _) in limites.items()) > vagas[t]:
+                return False
+        return True
+
+    def mover(g, t, sinal):
+        time_do_grupo[g] = t if sinal > 0 else None
+        vagas[t] -= sinal * len(grupos[g])
+        somas[t] += sinal * sum(valores[i] for i in grupos[g])
+        for p, n in posicoes_do_grupo[g].items():
+            base = limites[p][0]
+            antes = contagens[t][p]
+            contagens[t][p] += sinal * n
+            faltando[p] -= sinal * n
+            com_extra[p] += (contagens[t][p] > base) - (antes > base)
+
+    restritos = {g for g in range(len(grupos)) if conflitos[g] or len(grupos[g]) > 1}
+    restritos |= {g for g in range(len(grupos)) for p in posicoes_do_grupo[g] if limites[p][0] <= 1}
+    ordem = sorted(range(len(grupos)), key=lambda g: (g not in restritos, -max(valores[i] for i in grupos[g])))
+    desempate = list(range(num_times))
+    if aleatorio is not None:
+        # Inícios diferentes por semente: grupos livres e times em ordem sorteada
+        livres = ordem[len(restritos):]
+        aleatorio.shuffle(livres)
+        ordem[len(restritos):] = livres
+        aleatorio.shuffle(desempate)
+    nos = [0]
+
+    def buscar(posicao):
+        if posicao == len(ordem):
+            return True
+        nos[0] += 1
+        if nos[0] > LIMITE_NOS or (nos[0] % 256 == 0 and time.perf_counter() > prazo):
+            raise _Esgotado
+        g = ordem[posicao]
+        candidatos = sorted(
+            (t for t in range(num_times) if cabe(g, t)),
+            key=lambda t: ((somas[t] / capacidades[t]) if aleatorio is None else 0, desempate[t]),
+        )
+        for t in candidatos:
+            mover(g, t, 1)
+            if (
+                all(any(cabe(outro, u) for u in range(num_times)) for outro in conflitos[g] if time_do_grupo[outro] is None)
+                and posicoes_cabem()
+                and buscar(posicao + 1)
+            ):
+                return True
+            mover(g, t, -1)
+        return False
+
+    if not buscar(0):
+        return None
+    times = [[] for _ in range(num_times)]
+    for g, t in enumerate(time_do_grupo):
+        times[t].extend(grupos[g])
+    return times
+
+
+def _equilibrar(valores, times, restricoes, prazo):
+    """Busca local que só troca jogadores da mesma posição, fora de grupos 'juntar'.
+
+    Como em _busca_local, cada par de times troca o par (x, y) que mais aproxima
+    as médias, desde que a troca não junte ninguém que deva ficar separado.
+    """
+    posicoes = restricoes.posicoes or [''] * len(valores)
+    presos = {i for par in restricoes.juntar for i in par}
+    separar = {}
+    for a, b in restricoes.separar:
+        separar.setdefault(a, set()).add(b)
+        separar.setdefault(b, set()).add(a)
+    membros = [set(time) for time in times]
+    somas = [sum(valores[i] for i in time) for time in times]
+    media_geral = sum(somas) / max(len(valores), 1)
+
+    def custo(soma, tamanho):
+        return (soma / tamanho - media_geral) ** 2
+
+    def permitido(x, y, a, b):
+        return not (separar.get(x, set()) & (membros[b] - {y}) or separar.get(y, set()) & (membros[a] - {x}))
+
+    ativos = [t for t in range(len(times)) if times[t]]
+    melhorou = True
+    while melhorou and time.perf_counter() < prazo:
+        melhorou = False
+        for posicao, a in enumerate(ativos):
+            for b in ativos[posicao + 1:]:
+                n_a, n_b = len(times[a]), len(times[b])
+                d_alvo = (somas[a] / n_a - somas[b] / n_b) / (1 / n_a + 1 / n_b)
+                melhor = None
+                livres_b = {}
+                for j in membros[b] - presos:
+                    livres_b.setdefault(posicoes[j], []).append(j)
+                for lista in livres_b.values():
+                    lista.sort(key=lambda j: valores[j])
+                for i in membros[a] - presos:
+                    lista = livres_b.get(posicoes[i])
+                    if not lista:
+                        continue
+                    k = bisect_left([valores[j] for j in lista], valores[i] - d_alvo)
+                    # Do candidato mais próximo para fora, até achar uma troca permitida
+                    for candidato in sorted(range(len(lista)), key=lambda c: abs(c - k + 0.5))[:8]:
+                        j = lista[candidato]
+                        if permitido(i, j, a, b):
+                            erro = abs(valores[i] - valores[j] - d_alvo)
+                            if melhor is None or erro < melhor[0]:
+                                melhor = (erro, i, j)
+                            break
+                if melhor is None:
+                    continue
+                _, i, j = melhor
+                delta = valores[i] - valores[j]
+                if custo(somas[a] - delta, n_a) + custo(somas[b] + delta, n_b) < custo(somas[a], n_a) + custo(somas[b], n_b) - 1e-12:
+                    membros[a].remove(i)
+                    membros[a].add(j)
+                    membros[b].remove(j)
+                    membros[b].add(i)
+                    somas[a] -= delta
+                    somas[b] += delta
+                    melhorou = True
+    return [sorted(time) for time in membros]
+
+
+def _resolver(valores, num_times, restricoes, prazo, aleatorio=None):
+    times = _montar(valores, num_times, restricoes, prazo, aleatorio)
+    if times is None:
+        return None
+    return _equilibrar(valores, times, restricoes, prazo)
+
+
+REINICIOS_RESTRICOES = 16
+
+
+def _melhor_reinicio(valores, num_times, restricoes, times, prazo):
+    """Refaz a busca com REINICIOS_RESTRICOES inícios sorteados e fica com a mais equilibrada.
+
+    As trocas só entre jogadores da mesma posição param cedo em ótimos locais.
+    As sementes são fixas: o resultado se repete enquanto couber no prazo.
+    """
+    melhor = (avaliar(valores, times), times)
+    for semente in range(REINICIOS_RESTRICOES):
+        if time.perf_counter() > prazo:
+            break
+        try:
+            tentativa = _resolver(valores, num_times, restricoes, prazo, random.Random(semente))
+        except _Esgotado:
+            continue
+        if tentativa is not None and avaliar(valores, tentativa) < melhor[0]:
+            melhor = (avaliar(valores, tentativa), tentativa)
+    return melhor[1]
+
+
+def balancear_com_restricoes(valores, num_times, restricoes, tempo_limite=2.0):
+    """Divide os jogadores cumprindo as restrições.
+
+    Retorna (times, relaxadas, nao_verificadas). Se não há divisão com todos
+    os pares, eles são aceitos um a um, na ordem em que vieram: ficam em
+    relaxadas os que comprovadamente tornariam o sorteio impossível e em
+    nao_verificadas os que o prazo (ou o limite de nós da busca) não deixou
+    decidir; nenhum dos dois é cumprido. Cada par é ('separar' | 'juntar', i,
+    j); ('posicoes', None, None) indica que nem as posições couberam (ou não
+    deu tempo de verificá-las) e a divisão é a gulosa sem restrições.
+    """
+    prazo = time.perf_counter() + tempo_limite
+    try:
+        times = _resolver(valores, num_times, restricoes, prazo)
+    except _Esgotado:
+        times = None
+    if times is not None:
+        return _melhor_reinicio(valores, num_times, restricoes, times, prazo), [], []
+    try:
+        times = _resolver(valores, num_times, restricoes.com_pares([]), prazo)
+    except _Esgotado:
+        return guloso(valores, num_times), [], [('posicoes', None, None)] + restricoes.pares()
+    if times is None:
+        return guloso(valores, num_times), [('posicoes', None, None)] + restricoes.pares(), []
+    aceitos, relaxadas, nao_verificadas = [], [], []
+    for par in restricoes.pares():
+        try:
+            tentativa = _resolver(valores, num_times, restricoes.com_pares(aceitos + [par]), prazo)
+        except _Esgotado:
+            nao_verificadas.append(par)
+            continue
+        if tentativa is None:
+            relaxadas.append(par)
+        else:
+            aceitos.append(par)
+            times = tentativa
+    times = _melhor_reinicio(valores, num_times, restricoes.com_pares(aceitos), times, prazo)
+    return times, relaxadas, nao_verificadas
+
+
+def _inicial_aleatorio(valores, num_times, aleatorio):
+    """Jogadores embaralhados e cortados nos tamanhos dos times"""
+    ordem = list(range(len(valores)))
+    aleatorio.shuffle(ordem)
+    times = []
+    inicio = 0
+    for tamanho in tamanhos_dos_times(len(valores), num_times):
+        times.append(ordem[inicio:inicio + tamanho])
+        inicio += tamanho
+    return times
+
+
+def _forma_canonica(times):
+    """Mesma divisão com os times e os índices em ordem: divisões iguais comparam iguais"""
+    return sorted(sorted(time) for time in times)
+
+
+def _candidatos(valores, num_times, sementes, limite, restricoes=None):
+    """Busca local até convergir a partir de um início aleatório por semente.
+
+    Roda nos processos do pool. Cada divisão devolvida depende só da sua
+    semente. limite (time.time(), o mesmo para todos os lotes) é uma rede de
+    segurança: ao estourar, a tentativa em andamento é descartada e as
+    seguintes não rodam. Retorna (candidatos, completo), com completo=False se
+    alguma tentativa ficou de fora.
+    """
+    prazo = time.perf_counter() + (limite - time.time())
+    resultados = []
+    for semente in sementes:
+        restante = prazo - time.perf_counter()
+        if restante <= 0:
+            return resultados, False
+        if restricoes:
+            try:
+                times = _resolver(valores, num_times, restricoes, prazo, random.Random(semente))
+            except _Esgotado:
+                # Sem decisão dentro de LIMITE_NOS (o prazo é conferido logo abaixo)
+                times = None
+        else:
+            times = _busca_local(valores, _inicial_aleatorio(valores, num_times, random.Random(semente)), restante)
+        if time.perf_counter() > prazo:
+            return resultados, False
+        if times is not None:
+            resultados.append((avaliar(valores, times), semente, _forma_canonica(times)))
+    return resultados, True
+
+
+_pool = None
+_pool_trava = threading.Lock()
+FOLGA_POOL = 0.5
+
+
+def _executor(processos):
+    """Pool de processos do módulo, criado no primeiro uso e reaproveitado.
+
+    Os processos são iniciados com 'spawn': um fork feito dentro do worker do
+    Django herdaria conexões com o banco e threads já abertas. O pool só é
+    refeito quando muda o número de processos ou quando quebra (um processo
+    morto deixa o pool inutilizável).
+    """
+    global _pool
+    with _pool_trava:
+        if _pool is None or _pool._max_workers != processos or _pool._broken:
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = ProcessPoolExecutor(max_workers=processos, mp_context=get_context('spawn'))
+        return _pool
+
+
+class Opcoes(list):
+    """Opções do sorteio, (diferença entre médias, times) da mais equilibrada.
+
+    completas é False quando o prazo de segurança cortou tentativas: aí as
+    opções podem não se repetir com a mesma semente.
+    """
+    def __init__(self, opcoes, completas=True):
+        super().__init__(opcoes)
+        self.completas = completas
+
+
+def alternativas(valores, num_times=4, k=3, tentativas=64, semente=0, tempo_limite=2.0, processos=None,
+                 restricoes=None):
+    """As k melhores divisões distintas entre várias buscas locais com inícios aleatórios.
+
+    As sementes de cada tentativa saem de 'semente' e cada busca vai até
+    convergir, então a mesma semente gera as mesmas opções em qualquer máquina;
+    a divisão gulosa de sempre entra como candidata. As tentativas são
+    repartidas em lotes pelo pool de processos do módulo (processos=0 roda tudo
+    aqui mesmo). tempo_limite só protege contra um elenco grande demais: se
+    estourar, as opções saem do que ficou pronto, com um aviso no log e
+    Opcoes.completas=False. Com restricoes, todas as opções cumprem as mesmas
+    restrições que o sorteio padrão (balancear_com_restricoes) conseguiu cumprir.
+    """
+    inicio = time.perf_counter()
+    gerador = random.Random(semente)
+    sementes = [gerador.getrandbits(64) for _ in range(tentativas)]
+    # A divisão gulosa de sempre também concorre; em empate fica na frente
+    if restricoes:
+        padrao, relaxadas, nao_verificadas = balancear_com_restricoes(
+            valores, num_times, restricoes, tempo_limite / 4
+        )
+        fora = relaxadas + nao_verificadas
+        restricoes = None if ('posicoes', None, None) in fora else restricoes.com_pares(
+            [par for par in restricoes.pares() if par not in fora]
+        )
+    else:
+        padrao = guloso(valores, num_times)
+    candidatos = [(avaliar(valores, padrao), -1, _forma_canonica(padrao))]
+    processos = os.cpu_count() if processos is None else processos
+    restante = tempo_limite - (time.perf_counter() - inicio)
+    limite = time.time() + restante
+
+    if processos > 1 and len(sementes) > 1:
+        tamanho_lote = max(1, -(-len(sementes) // (processos * 4)))
+        lotes = [sementes[i:i + tamanho_lote] for i in range(0, len(sementes), tamanho_lote)]
+        futuros = [
+            _executor(processos).submit(_candidatos, valores, num_times, lote, limite, restricoes)
+            for lote in lotes
+        ]
+        # Folga para os lotes que param no limite devolverem o que já tinham
+        prontos, atrasados = wait(futuros, timeout=max(restante, 0) + FOLGA_POOL)
+        # Não espera os lotes atrasados: os que já começaram param sozinhos no prazo
+        for futuro in atrasados:
+            futuro.cancel()
+        completas = not atrasados
+        for futuro in prontos:
+            if futuro.exception() is None:
+                resultados, completo = futuro.result()
+                candidatos += resultados
+                completas = completas and completo
+            else:
+                completas = False
+    else:
+        resultados, completas = _candidatos(valores, num_times, sementes, limite, restricoes)
+        candidatos += resultados
+
+    if not completas:
+        logger.warning(
+            'Opções do sorteio cortadas pelo prazo de %.1f s (%d jogadores, %d tentativas)',
+            tempo_limite, len(valores), tentativas,
+        )
+    opcoes = []
+    vistas = set()
+    for (spread, _), _, times in sorted(candidatos, key=lambda c: (c[0], c[1])):
+        chave = tuple(map(tuple, times))
+        if chave not in vistas:
+            vistas.add(chave)
+            opcoes.append((spread, times))
+        if len(opcoes) == k:
+            break
+    return Opcoes(opcoes, completas)
+
+
+ESTRATEGIAS = {
+    'serpentina': serpentina,
+    'guloso': guloso,
+    'exato': exato,
+}
+
+
+def registrar_estrategia(nome, funcao):
+    """Permite plugar novas estratégias de balanceamento"""
+    ESTRATEGIAS[nome] = funcao
+
+
+def balancear(valores, num_times=4, estrategia='guloso', **opcoes):
+    """Divide os índices de 'valores' em 'num_times' times usando a estratégia escolhida"""
+    try:
+        funcao = ESTRATEGIAS[estrategia]
+    except KeyError:
+        raise ValueError(f'Estratégia de balanceamento desconhecida: {estrategia}')
+    return funcao(list(valores), num_times, **opcoes)
@@ -0,0 +1,123 @@
+"""Cache versionado dos dados derivados das notas (sorteio dos times).
+
+Toda escrita em Avaliacao ou Jogador troca a "versão das notas" (ver
+signals.py). Os valores calculados ficam guardados sob uma chave que inclui essa
+versão, então uma escrita invalida tudo de uma vez sem precisar apagar chaves.
+A versão nova é um uuid gravado com set, e não cache.incr: nos backends de banco
+e de arquivo o incr lê e grava em dois passos, e duas escritas simultâneas
+podiam chegar ao mesmo número (e a uma chave já usada).
+
+Quando a versão muda e vários votantes pedem o parcial ao mesmo tempo, só um
+deles recalcula: quem consegue o lock calcula e grava; os demais esperam o valor
+aparecer. cache.add é atômico no locmem e no backend de banco; no de arquivo ele
+também lê antes de gravar, então o lock é só de melhor esforço e dois processos
+podem, às vezes, calcular o mesmo valor.
+"""
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from . import eventos
+
+CHAVE_VERSAO = 'sorteio:versao-notas'
+CHAVE_MODIFICACAO = 'sorteio:notas-modificadas-em'
+TEMPO_LOCK = 30
+ESPERA_MAXIMA = 5.0
+INTERVALO_ESPERA = 0.05
+
+# Estado de em_lote() por thread
+_lote = threading.local()
+
+
+def _cache():
+    return caches[getattr(settings, 'SORTEIO_CACHE_ALIAS', 'default')]
+
+
+def versao_notas():
+    """Versão atual das notas; aleatória para não repetir uma antiga após perder a chave"""
+    cache = _cache()
+    versao = cache.get(CHAVE_VERSAO)
+    if versao is None:
+        cache.add(CHAVE_VERSAO, uuid.uuid4().hex, timeout=None)
+        versao = cache.get(CHAVE_VERSAO)
+    return versao
+
+
+def _incrementar_versao():
+    cache = _cache()
+    cache.set(CHAVE_VERSAO, uuid.uuid4().hex, timeout=None)
+    cache.set(CHAVE_MODIFICACAO, time.time(), timeout=None)
+
+
+def modificado_em():
+    """Timestamp da última alteração das notas, ou None se o cache não souber"""
+    return _cache().get(CHAVE_MODIFICACAO)
+
+
+def invalidar():
+    """Troca a versão das notas e avisa os dashboards ao vivo quando a transação atual for confirmada"""
+    if getattr(_lote, 'profundidade', 0):
+        _lote.pendente = True
+        return
+    transaction.on_commit(_incrementar_versao)
+    transaction.on_commit(eventos.notificar)
+
+
+@contextmanager
+def em_lote():
+    """Agrupa as invalidações feitas dentro do bloco (sinais de cada linha) em uma só, no fim"""
+    _lote.profundidade = getattr(_lote, 'profundidade', 0) + 1
+    try:
+        yield
+    finally:
+        _lote.profundidade -= 1
+        pendente = getattr(_lote, 'pendente', False)
+        if not _lote.profundidade and pendente:
+            _lote.pendente = False
+            invalidar()
+
+
+def primeira_vez(nome, timeout=86400):
+    """True só para a primeira chamada com esse nome dentro do timeout (entre todos os processos)"""
+    return _cache().add(f'sorteio:{nome}', True, timeout=timeout)
+
+
+def esquecer(nome):
+    """Desfaz primeira_vez(nome): a próxima chamada volta a ser a primeira"""
+    _cache().delete(f'sorteio:{nome}')
+
+
+def obter(nome, calcular, *partes):
+    """Retorna o valor de 'calcular()' para a versão atual, calculando uma vez só"""
+    cache = _cache()
+    chave = ':'.join(['sorteio', nome, str(versao_notas())] + [str(p) for p in partes])
+    valor = cache.get(chave)
+    if valor is not None:
+        return valor
+
+    chave_lock = f'{chave}:lock'
+    dono = uuid.uuid4().hex
+    if cache.add(chave_lock, dono, timeout=TEMPO_LOCK):
+        try:
+            valor = calcular()
+            cache.set(chave, valor, timeout=getattr(settings, 'SORTEIO_CACHE_TIMEOUT', 3600))
+        finally:
+            if cache.get(chave_lock) == dono:
+                cache.delete(chave_lock)
+        return valor
+
+    # Outro processo está calculando: espera o resultado em vez de repetir o trabalho
+    limite = time.monotonic() + ESPERA_MAXIMA
+    while time.monotonic() < limite:
+        time.sleep(INTERVALO_ESPERA)
+        valor = cache.get(chave)
+        if valor is not None:
+            return valor
+        if cache.get(chave_lock) is None:
+            break
+    return calcular()
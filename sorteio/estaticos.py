@@ -0,0 +1,69 @@
+"""Arquivos estáticos com nome por hash e versões pré-comprimidas.
+
+O collectstatic grava cada arquivo com o hash do conteúdo no nome (manifest) e,
+ao lado, as versões .gz e .br (quando o pacote brotli estiver instalado). O
+ServirEstaticosMiddleware entrega esses arquivos direto do STATIC_ROOT.
+"""
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli é opcional
+    brotli = None
+
+# Formatos que já vêm comprimidos: comprimir de novo só gasta CPU
+EXTENSOES_JA_COMPRIMIDAS = {
+    '.png', '.jpg', '.jpeg', '.gif', '.webp', '.avif', '.ico',
+    '.woff', '.woff2', '.zip', '.gz', '.br', '.mp4', '.webm', '.mp3',
+}
+# Uma versão comprimida só é gravada se economizar pelo menos 5%
+PROPORCAO_MAXIMA = 0.95
+
+# Extensão do arquivo -> valor de Content-Encoding, na ordem de preferência
+CODIFICACOES = {'.br': 'br', '.gz': 'gzip'}
+
+
+def _compressores():
+    compressores = {}
+    if brotli is not None:
+        compressores['.br'] = lambda dados: brotli.compress(dados, quality=11)
+    compressores['.gz'] = lambda dados: gzip.compress(dados, compresslevel=9, mtime=0)
+    return compressores
+
+
+def comprimir_arquivo(caminho):
+    """Grava as versões comprimidas de um arquivo; retorna as extensões gravadas"""
+    if os.path.splitext(caminho)[1].lower() in EXTENSOES_JA_COMPRIMIDAS:
+        return []
+    with open(caminho, 'rb') as arquivo:
+        dados = arquivo.read()
+    gravadas = []
+    for extensao, comprimir in _compressores().items():
+        comprimido = comprimir(dados)
+        if len(comprimido) <= len(dados) * PROPORCAO_MAXIMA:
+            with open(caminho + extensao, 'wb') as arquivo:
+                arquivo.write(comprimido)
+            gravadas.append(extensao)
+    return gravadas
+
+
+class ArmazenamentoComprimido(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage que também gera as versões .gz/.br no collectstatic"""
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        # Só depois de todas as passadas do manifest o conteúdo final está gravado
+        for nome in set(paths) | set(self.hashed_files.values()):
+            if self.exists(nome):
+                comprimir_arquivo(self.path(nome))
+
+    def stored_name(self, name):
+        # Sem manifest (collectstatic não rodou, como nos testes) usa o nome original
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
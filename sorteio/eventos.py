@@ -0,0 +1,79 @@
+"""Pub/sub em processo para o dashboard ao vivo do admin (server-sent events).
+
+Gravações de notas chamam notificar() quando a transação é confirmada (ver
+cache.invalidar) e cada conexão SSE aberta neste processo acorda na hora. Com
+vários workers, uma gravação feita em outro processo não passa por aqui: por
+isso cada conexão também relê os números a cada INTERVALO_CONSULTA segundos.
+A leitura é compartilhada: conexões que acordam juntas reaproveitam o mesmo
+resultado, então muitos dashboards abertos custam uma consulta por mudança.
+"""
+import asyncio
+import json
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+
+INTERVALO_CONSULTA = 5.0
+VALIDADE_NUMEROS = 1.0
+
+_trava = threading.Lock()
+_assinantes = set()
+_geracao = 0
+_ultimos = {}
+
+
+def notificar():
+    """Acorda as conexões abertas neste processo (pode ser chamada de qualquer thread)"""
+    global _geracao
+    with _trava:
+        _geracao += 1
+        assinantes = list(_assinantes)
+    for loop, evento in assinantes:
+        try:
+            loop.call_soon_threadsafe(evento.set)
+        except RuntimeError:
+            # Loop já encerrado: a conexão morreu sem passar pelo finally
+            with _trava:
+                _assinantes.discard((loop, evento))
+
+
+def _ler(calcular):
+    """Resultado de calcular(), reaproveitado enquanto não houver notificação nem passar a validade"""
+    with _trava:
+        geracao = _geracao
+    anterior = _ultimos.get(calcular)
+    agora = time.monotonic()
+    if anterior and anterior[0] == geracao and agora - anterior[1] < VALIDADE_NUMEROS:
+        return anterior[2]
+    valor = calcular()
+    _ultimos[calcular] = (geracao, agora, valor)
+    return valor
+
+
+async def fluxo(calcular):
+    """Eventos SSE com o dicionário de calcular(): tudo no primeiro, depois só o que mudou"""
+    evento = asyncio.Event()
+    assinante = (asyncio.get_running_loop(), evento)
+    with _trava:
+        _assinantes.add(assinante)
+    enviados = {}
+    try:
+        yield 'retry: 3000\n\n'
+        while True:
+            evento.clear()
+            numeros = await sync_to_async(_ler)(calcular)
+            diferenca = {nome: valor for nome, valor in numeros.items() if enviados.get(nome) != valor}
+            if diferenca:
+                enviados.update(diferenca)
+                yield f'data: {json.dumps(diferenca)}\n\n'
+            else:
+                # Comentário SSE: mantém a conexão viva e detecta clientes que saíram
+                yield ':\n\n'
+            try:
+                await asyncio.wait_for(evento.wait(), INTERVALO_CONSULTA)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        with _trava:
+            _assinantes.discard(assinante)
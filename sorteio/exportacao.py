@@ -0,0 +1,116 @@
+"""Exportação das notas, dos jogadores e do sorteio em CSV ou NDJSON, em fluxo.
+
+As linhas saem do banco em lotes (iterator com chunk_size) e já como tuplas
+(values_list), sem instanciar modelos: a memória usada não depende do tamanho
+das tabelas. Usado pela view exportar e pelo comando exportar_dados.
+"""
+import csv
+import json
+from itertools import chain, islice
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Value
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from . import cache
+from .models import Avaliacao, AvaliacaoArquivada, Jogador
+
+# Linhas lidas do banco por vez e linhas por pedaço enviado ao cliente
+TAMANHO_LOTE = 2000
+LINHAS_POR_PEDACO = 500
+
+
+def avaliacoes(tamanho_lote=TAMANHO_LOTE):
+    """Todas as notas: as da tabela quente e as das rodadas arquivadas"""
+    colunas = ('id', 'rodada', 'avaliador', 'jogador', 'nota', 'data_avaliacao', 'arquivada')
+    campos = ('id', 'rodada_id', 'avaliador__username', 'jogador__nome', 'nota', 'data_avaliacao')
+    arquivo = AvaliacaoArquivada.objects.order_by('pk').values_list(*campos, Value(True))
+    quente = Avaliacao.objects.order_by('pk').values_list(*campos, Value(False))
+    return colunas, chain(arquivo.iterator(chunk_size=tamanho_lote), quente.iterator(chunk_size=tamanho_lote))
+
+
+def jogadores(tamanho_lote=TAMANHO_LOTE):
+    """Jogadores com posição, total de votos, média e média recente"""
+    colunas = ('id', 'nome', 'posicao', 'ativo', 'data_cadastro', 'total_votos', 'media', 'media_recente')
+    linhas = Jogador.objects.com_medias().order_by('nome').values_list(
+        'id', 'nome', 'posicao', 'ativo', 'data_cadastro', 'count_votos', 'media_notas', 'media_recente'
+    )
+    return colunas, linhas.iterator(chunk_size=tamanho_lote)
+
+
+def times(tamanho_lote=TAMANHO_LOTE):
+    """Sorteio atual (o mesmo das páginas, lido do cache), um jogador por linha"""
+    from .views import distribuir_times_equilibrados
+
+    colunas = ('time', 'media_time', 'jogador_id', 'jogador', 'nota')
+    linhas = (
+        (numero, time.media_time, jogador.pk, jogador.nome, jogador.nota_sorteio)
+        for numero, time in enumerate(cache.obter('times', distribuir_times_equilibrados), start=1)
+        for jogador in time
+    )
+    return colunas, linhas
+
+
+EXPORTACOES = {
+    'avaliacoes': avaliacoes,
+    'jogadores': jogadores,
+    'times': times,
+}
+
+
+class _Eco:
+    """Arquivo falso para o csv.writer: write devolve a linha formatada"""
+    def write(self, valor):
+        return valor
+
+
+def _csv(colunas, linhas):
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(colunas)
+    for linha in linhas:
+        yield escritor.writerow(linha)
+
+
+def _ndjson(colunas, linhas):
+    for linha in linhas:
+        yield json.dumps(dict(zip(colunas, linha)), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+FORMATOS = {
+    'csv': (_csv, 'text/csv; charset=utf-8'),
+    'ndjson': (_ndjson, 'application/x-ndjson; charset=utf-8'),
+}
+
+
+def exportar(tipo, formato, tamanho_lote=TAMANHO_LOTE):
+    """Gera o conteúdo da exportação em pedaços de texto de LINHAS_POR_PEDACO linhas"""
+    colunas, linhas = EXPORTACOES[tipo](tamanho_lote)
+    texto = FORMATOS[formato][0](colunas, linhas)
+    while pedaco := ''.join(islice(texto, LINHAS_POR_PEDACO)):
+        yield pedaco
+
+
+async def _em_fluxo_assincrono(pedacos):
+    # Cada pedaço é lido na thread das views síncronas (mesma conexão com o banco)
+    proximo = sync_to_async(next)
+    fim = object()
+    while (pedaco := await proximo(pedacos, fim)) is not fim:
+        yield pedaco
+
+
+def resposta(request, tipo, formato):
+    """StreamingHttpResponse com a exportação como anexo.
+
+    No ASGI um iterador síncrono seria lido inteiro para a memória antes do
+    envio; lá o fluxo vira um gerador assíncrono que busca um pedaço por vez.
+    """
+    pedacos = exportar(tipo, formato)
+    if isinstance(request, ASGIRequest):
+        pedacos = _em_fluxo_assincrono(pedacos)
+    response = StreamingHttpResponse(pedacos, content_type=FORMATOS[formato][1])
+    response['Content-Disposition'] = f'attachment; filename="{tipo}-{timezone.localdate()}.{formato}"'
+    response['Cache-Control'] = 'no-store'
+    return response
@@ -1,6 +1,9 @@
+import csv
+
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from .models import Votante, Jogador, Avaliacao
 
 class CadastroVotanteForm(UserCreationForm):
@@ -75,14 +78,62 @@ class CadastroJogadorForm(forms.ModelForm):
     """Formulário para o admin cadastrar jogadores"""
     class Meta:
         model = Jogador
-        fields = ['nome']
+        fields = ['nome', 'posicao']
         widgets = {
             'nome': forms.TextInput(attrs={
                 'class': 'form-control',
                 'placeholder': 'Digite o nome do jogador'
-            })
+            }),
+            'posicao': forms.Select(attrs={'class': 'form-select'}),
         }
 
+class ImportarJogadoresForm(forms.Form):
+    """Cadastro em lote: um jogador por linha, colado ou em um arquivo CSV (coluna 'nome' ou a primeira)"""
+    nomes = forms.CharField(
+        label='Nomes (um por linha)',
+        required=False,
+        widget=forms.Textarea(attrs={
+            'class': 'form-control',
+            'rows': 8,
+            'placeholder': 'Um nome por linha'
+        })
+    )
+    arquivo = forms.FileField(
+        label='Ou arquivo CSV',
+        required=False,
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,text/csv'})
+    )
+    
+    def _ler_nomes(self, texto):
+        linhas = [linha for linha in csv.reader(texto.splitlines()) if linha]
+        # Com cabeçalho (como no CSV exportado), o nome vem da coluna 'nome'
+        cabecalho = [coluna.strip().lower() for coluna in linhas[0]] if linhas else []
+        coluna = cabecalho.index('nome') if 'nome' in cabecalho else 0
+        if 'nome' in cabecalho:
+            linhas = linhas[1:]
+        return [linha[coluna].strip() for linha in linhas if len(linha) > coluna and linha[coluna].strip()]
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        nomes = self._ler_nomes(cleaned_data.get('nomes') or '')
+        arquivo = cleaned_data.get('arquivo')
+        if arquivo:
+            try:
+                nomes += self._ler_nomes(arquivo.read().decode('utf-8-sig'))
+            except UnicodeDecodeError:
+                raise ValidationError('O arquivo precisa estar em UTF-8.')
+        if not nomes:
+            raise ValidationError('Informe pelo menos um nome.')
+        limite = Jogador._meta.get_field('nome').max_length
+        longos = [nome for nome in nomes if len(nome) > limite]
+        if longos:
+            raise ValidationError(f'Nomes com mais de {limite} caracteres: {", ".join(longos)}.')
+        cleaned_data['lista_nomes'] = nomes
+        return cleaned_data
+    
+    def save(self):
+        return Jogador.objects.importar(self.cleaned_data['lista_nomes'])
+
 class AvaliacaoForm(forms.ModelForm):
     """Formulário para avaliar um jogador"""
     class Meta:
@@ -96,4 +147,48 @@ class AvaliacaoForm(forms.ModelForm):
         }
         labels = {
             'nota': 'Sua nota (0-10)'
-        }
\ No newline at end of file
+        }
+
+class AvaliacaoJogadorForm(AvaliacaoForm):
+    """Nota com o jogador identificado no próprio formulário (reenvio não troca de jogador)"""
+    jogador = forms.IntegerField(widget=forms.HiddenInput)
+
+class BaseAvaliacaoLoteFormSet(forms.BaseFormSet):
+    """Formulários de nota para todos os jogadores restantes do votante"""
+    def __init__(self, *args, avaliador, jogadores, **kwargs):
+        self.avaliador = avaliador
+        self.jogadores_por_id = {j.pk: j for j in jogadores}
+        kwargs.setdefault('initial', [{'jogador': j.pk} for j in jogadores])
+        super().__init__(*args, **kwargs)
+    
+    def _construct_form(self, i, **kwargs):
+        form = super()._construct_form(i, **kwargs)
+        jogador_id = form.initial.get('jogador')
+        if form.is_bound:
+            try:
+                jogador_id = int(form.data.get(form.add_prefix('jogador')))
+            except (TypeError, ValueError):
+                jogador_id = None
+        form.jogador_avaliado = self.jogadores_por_id.get(jogador_id)
+        return form
+    
+    def clean(self):
+        if any(self.errors):
+            return
+        ids = [form.cleaned_data['jogador'] for form in self.forms]
+        if len(set(ids)) != len(ids):
+            raise ValidationError('Cada jogador só pode receber uma nota.')
+        if set(ids) - self.jogadores_por_id.keys():
+            raise ValidationError('A lista de jogadores mudou. Recarregue a página e vote novamente.')
+        # Confere o unique_together (rodada, avaliador, jogador) antes do bulk_create
+        ja_avaliados = list(Avaliacao.objects.filter(
+            rodada_id=timezone.localdate(), avaliador=self.avaliador, jogador_id__in=ids
+        ).values_list('jogador__nome', flat=True))
+        if ja_avaliados:
+            raise ValidationError(f'Você já avaliou: {", ".join(sorted(ja_avaliados))}.')
+    
+    def save(self):
+        notas = {form.jogador_avaliado.pk: form.cleaned_data['nota'] for form in self.forms}
+        return Avaliacao.objects.registrar_notas(self.avaliador, notas)
+
+AvaliacaoLoteFormSet = forms.formset_factory(AvaliacaoJogadorForm, formset=BaseAvaliacaoLoteFormSet, extra=0)
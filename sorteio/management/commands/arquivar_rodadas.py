@@ -0,0 +1,24 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from sorteio.models import Rodada
+
+
+class Command(BaseCommand):
+    help = (
+        'Arquiva as rodadas fechadas: resume as notas por jogador e move as avaliações brutas '
+        'para a tabela de arquivo, deixando na tabela quente só a rodada atual. '
+        'Agende uma vez por dia, fora do horário de votação (ex.: cron às 4h)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ate', type=date.fromisoformat, default=None,
+            help='Arquiva as rodadas anteriores a esta data (AAAA-MM-DD; padrão: hoje)',
+        )
+
+    def handle(self, *args, **options):
+        arquivadas = Rodada.objects.arquivar(options['ate'])
+        for rodada in arquivadas:
+            self.stdout.write(f'Rodada {rodada} arquivada.')
+        self.stdout.write(self.style.SUCCESS(f'{len(arquivadas)} rodadas arquivadas.'))
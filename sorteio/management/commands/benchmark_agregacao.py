@@ -0,0 +1,75 @@
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from sorteio import normalizacao
+from sorteio.models import EstatisticaJogador, Rodada
+
+MODOS = ('media', 'aparada', 'mediana', 'winsorizada')
+
+
+class Command(BaseCommand):
+    help = (
+        'Cria um banco de teste descartável com avaliações sintéticas e compara o tempo das '
+        'agregações robustas (média aparada, mediana, winsorizada) e das notas corrigidas pelo viés dos votantes '
+        'com o AVG simples e com o agregado materializado'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--avaliacoes', type=int, default=1_000_000)
+        parser.add_argument('--jogadores', type=int, default=200)
+        parser.add_argument('--dias', type=int, default=365)
+        parser.add_argument('--percentual', type=int, default=10)
+        parser.add_argument('--repeticoes', type=int, default=3)
+        parser.add_argument('--arquivar', action='store_true', help='Move as rodadas passadas para o arquivo antes')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        nome_original = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            num_jogadores = options['jogadores']
+            call_command(
+                'popular_banco',
+                votantes=-(-options['avaliacoes'] // num_jogadores),
+                jogadores=num_jogadores,
+                avaliacoes=options['avaliacoes'],
+                dias=options['dias'],
+                seed=options['seed'],
+                stdout=self.stdout,
+            )
+            if options['arquivar']:
+                self.stdout.write(f'{len(Rodada.objects.arquivar())} rodadas arquivadas.')
+            self._comparar(options)
+        finally:
+            connection.creation.destroy_test_db(nome_original, verbosity=0)
+
+    def _medir(self, rotulo, funcao, repeticoes, unidade='jogadores'):
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            resultado = funcao()
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        self.stdout.write(f'  {rotulo:<28}{min(tempos):>10.1f} ms  ({len(resultado)} {unidade})')
+
+    def _comparar(self, options):
+        repeticoes = options['repeticoes']
+        self.stdout.write(self.style.MIGRATE_HEADING(f'Nota por jogador (melhor de {repeticoes})'))
+        self._medir(
+            'materializado',
+            lambda: dict(EstatisticaJogador.objects.values_list('jogador_id', 'soma_notas')),
+            repeticoes,
+        )
+        for modo in MODOS:
+            self._medir(
+                modo if modo != 'media' else 'media (AVG nas notas)',
+                lambda: EstatisticaJogador.objects.medias_robustas(modo, options['percentual']),
+                repeticoes,
+            )
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Correção do viés dos votantes (NumPy)'))
+        self._medir('carregar matriz', normalizacao.MatrizNotas.do_banco, repeticoes, 'notas')
+        matriz = normalizacao.MatrizNotas.do_banco()
+        for modo in normalizacao.MODOS:
+            self._medir(f'{modo} (só o cálculo)', lambda: normalizacao.forcas_normalizadas(modo, matriz), repeticoes)
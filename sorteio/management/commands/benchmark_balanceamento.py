@@ -0,0 +1,41 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from sorteio.balanceamento import ESTRATEGIAS, LIMITE_EXATO, avaliar, balancear
+
+
+class Command(BaseCommand):
+    help = 'Mede tempo e qualidade (diferença entre médias dos times) de cada estratégia de balanceamento'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanhos', nargs='+', type=int, default=[24, 200, 1000, 5000])
+        parser.add_argument('--times', type=int, default=4)
+        parser.add_argument('--repeticoes', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'jogadores':>9}  {'estratégia':<12}{'tempo médio':>14}{'dif. médias':>14}{'dif. tamanhos':>15}")
+        for tamanho in options['tamanhos']:
+            gerador = random.Random(options['seed'] + tamanho)
+            elencos = [
+                [round(gerador.uniform(0, 10), 2) for _ in range(tamanho)]
+                for _ in range(options['repeticoes'])
+            ]
+            for estrategia in ESTRATEGIAS:
+                if estrategia == 'exato' and tamanho > LIMITE_EXATO:
+                    continue
+                tempos, spreads, desequilibrios = [], [], []
+                for notas in elencos:
+                    inicio = time.perf_counter()
+                    times = balancear(notas, options['times'], estrategia)
+                    tempos.append(time.perf_counter() - inicio)
+                    spread, desequilibrio = avaliar(notas, times)
+                    spreads.append(spread)
+                    desequilibrios.append(desequilibrio)
+                self.stdout.write(
+                    f'{tamanho:>9}  {estrategia:<12}'
+                    f'{sum(tempos) / len(tempos) * 1000:>11.2f} ms'
+                    f'{sum(spreads) / len(spreads):>14.5f}'
+                    f'{max(desequilibrios):>15}'
+                )
@@ -0,0 +1,197 @@
+import json
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.urls import resolve
+from sorteio import exportacao
+from sorteio.middleware import Medicao
+from sorteio.models import Votante
+from sorteio.urls import urlpatterns
+
+SENHA = 'senha-do-benchmark-123'
+# O stream SSE do dashboard não termina (e sem ASGI responde 204): fora da medição de propósito
+NAO_MEDIDAS = {'painel_eventos'}
+
+
+def percentil(valores, p):
+    """Percentil pelo método nearest-rank"""
+    ordenados = sorted(valores)
+    posicao = max(int(round(p / 100 * len(ordenados) + 0.5)) - 1, 0)
+    return ordenados[min(posicao, len(ordenados) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Simula um dia de votação (cadastro, login, votos, parciais, sorteios, importação e exportações do admin) '
+        'em um banco de teste descartável e mede latência e consultas por URL'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--votantes', type=int, default=20, help='Votantes simulados pelo fluxo completo')
+        parser.add_argument('--jogadores', type=int, default=24)
+        parser.add_argument('--votantes-historico', type=int, default=200, help='Votantes já existentes (dados de fundo)')
+        parser.add_argument('--dias-historico', type=int, default=30)
+        parser.add_argument('--parciais', type=int, default=3, help='Recargas do parcial por votante')
+        parser.add_argument('--sorteios', type=int, default=10, help='Visitas do admin a cada página administrativa')
+        parser.add_argument('--saida', default='benchmark_requisicoes.json')
+        parser.add_argument('--baseline', help='JSON de uma execução anterior para comparar')
+        parser.add_argument('--tolerancia', type=float, default=0.2, help='Piora relativa aceita no p95')
+        parser.add_argument('--tolerancia-ms', type=float, default=2.0, help='Piora absoluta aceita no p95')
+
+    def handle(self, *args, **options):
+        nome_original = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            call_command(
+                'popular_banco',
+                votantes=options['votantes_historico'],
+                jogadores=options['jogadores'],
+                dias=options['dias_historico'],
+                prefixo='historico',
+                stdout=self.stdout,
+            )
+            self.medidas = defaultdict(lambda: {'latencias': [], 'consultas': []})
+            self._simular_votantes(options)
+            self._simular_admin(options)
+        finally:
+            connection.creation.destroy_test_db(nome_original, verbosity=0)
+
+        resultados = self._resumir()
+        self._imprimir(resultados)
+        with open(options['saida'], 'w') as arquivo:
+            json.dump(resultados, arquivo, indent=2, sort_keys=True)
+        self.stdout.write(f"Resultados salvos em {options['saida']}")
+        if options['baseline']:
+            self._comparar(resultados, options['baseline'], options['tolerancia'], options['tolerancia_ms'])
+
+    def _requisicao(self, client, metodo, caminho, dados=None):
+        medicao = Medicao()
+        with ExitStack() as pilha:
+            for conexao in connections.all():
+                pilha.enter_context(conexao.execute_wrapper(medicao))
+            inicio = time.perf_counter()
+            response = getattr(client, metodo)(caminho, dados or {})
+            if response.streaming:
+                # Exportações: o tempo inclui gerar o conteúdo todo
+                b''.join(response.streaming_content)
+            decorrido = (time.perf_counter() - inicio) * 1000
+        if response.status_code >= 400:
+            raise CommandError(f'{metodo.upper()} {caminho} retornou {response.status_code}')
+        rota = resolve(caminho)
+        # Cada tipo e formato de exportação é medido à parte
+        nome = ':'.join([rota.url_name, *rota.kwargs.values()])
+        chave = f'{metodo.upper()} {nome}'
+        self.medidas[chave]['latencias'].append(decorrido)
+        self.medidas[chave]['consultas'].append(medicao.consultas)
+        return response
+
+    def _simular_votantes(self, options):
+        for i in range(options['votantes']):
+            client = Client(HTTP_HOST='localhost')
+            self._requisicao(client, 'get', '/')
+            self._requisicao(client, 'get', '/cadastro/')
+            self._requisicao(client, 'post', '/cadastro/', {
+                'nome_completo': f'Votante {i}',
+                'username': f'bench{i}',
+                'password1': SENHA,
+                'password2': SENHA,
+            })
+            self._requisicao(client, 'get', '/logout/')
+            self._requisicao(client, 'get', '/login/')
+            self._requisicao(client, 'post', '/login/', {'username': f'bench{i}', 'password': SENHA})
+
+            # O próximo jogador é lido direto do banco, fora da medição
+            votante = Votante.objects.get(username=f'bench{i}')
+            if i % 2:
+                # Metade dos votantes usa a votação em lote
+                self._requisicao(client, 'get', '/votar/todos/')
+                restantes = [j for j in votante.progresso_hoje().jogadores if not j.avaliado_hoje]
+                dados = {'form-TOTAL_FORMS': len(restantes), 'form-INITIAL_FORMS': len(restantes)}
+                for n, jogador in enumerate(restantes):
+                    dados[f'form-{n}-jogador'] = jogador.pk
+                    dados[f'form-{n}-nota'] = (i + n) % 11
+                self._requisicao(client, 'post', '/votar/todos/', dados)
+            else:
+                while True:
+                    response = self._requisicao(client, 'get', '/votar/')
+                    if response.status_code != 200:
+                        break
+                    jogador = votante.progresso_hoje().proximo
+                    self._requisicao(client, 'post', '/votar/', {'jogador': jogador.pk, 'nota': (i + jogador.pk) % 11})
+
+            for _ in range(options['parciais']):
+                self._requisicao(client, 'get', '/parcial/')
+
+    def _simular_admin(self, options):
+        Votante.objects.create_superuser('admin-benchmark', password=SENHA, nome_completo='Admin')
+        client = Client(HTTP_HOST='localhost')
+        self._requisicao(client, 'post', '/login/', {'username': 'admin-benchmark', 'password': SENHA})
+        for _ in range(options['sorteios']):
+            for caminho in (
+                '/admin-dashboard/', '/listar-jogadores/', '/sortear-times/', '/cadastrar-jogador/',
+                '/importar-jogadores/',
+            ):
+                self._requisicao(client, 'get', caminho)
+            # Só a primeira importação cria os jogadores; as seguintes os acham já cadastrados
+            self._requisicao(client, 'post', '/importar-jogadores/', {
+                'nomes': '\n'.join(f'Importado {n}' for n in range(5)),
+            })
+            for tipo in exportacao.EXPORTACOES:
+                for formato in exportacao.FORMATOS:
+                    self._requisicao(client, 'get', f'/admin-dashboard/exportar/{tipo}.{formato}')
+        self._conferir_cobertura()
+
+    def _conferir_cobertura(self):
+        """Avisa das URLs de sorteio/urls.py que a simulação não visitou"""
+        medidas = {chave.split(' ', 1)[1].split(':')[0] for chave in self.medidas}
+        faltando = sorted({padrao.name for padrao in urlpatterns} - medidas - NAO_MEDIDAS)
+        if faltando:
+            self.stdout.write(self.style.WARNING(f'URLs sem medição: {", ".join(faltando)}'))
+
+    def _resumir(self):
+        resultados = {}
+        for chave, medida in sorted(self.medidas.items()):
+            latencias = medida['latencias']
+            resultados[chave] = {
+                'requisicoes': len(latencias),
+                'p50_ms': round(percentil(latencias, 50), 2),
+                'p95_ms': round(percentil(latencias, 95), 2),
+                'p99_ms': round(percentil(latencias, 99), 2),
+                'consultas_media': round(sum(medida['consultas']) / len(latencias), 2),
+                'consultas_max': max(medida['consultas']),
+            }
+        return resultados
+
+    def _imprimir(self, resultados):
+        self.stdout.write(f"{'requisição':<36}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'consultas':>11}")
+        for chave, r in resultados.items():
+            self.stdout.write(
+                f"{chave:<36}{r['requisicoes']:>6}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}"
+                f"{r['p99_ms']:>10.2f}{r['consultas_media']:>11.2f}"
+            )
+
+    def _comparar(self, resultados, caminho_baseline, tolerancia, tolerancia_ms):
+        with open(caminho_baseline) as arquivo:
+            baseline = json.load(arquivo)
+        regressoes = []
+        self.stdout.write(self.style.MIGRATE_HEADING(f'Comparação com {caminho_baseline}'))
+        for chave, atual in resultados.items():
+            anterior = baseline.get(chave)
+            if anterior is None:
+                continue
+            variacao = (atual['p95_ms'] - anterior['p95_ms']) / anterior['p95_ms'] if anterior['p95_ms'] else 0
+            consultas = atual['consultas_max'] - anterior['consultas_max']
+            linha = f'{chave:<36} p95 {variacao:+.0%}  consultas {consultas:+d}'
+            piorou = variacao > tolerancia and atual['p95_ms'] - anterior['p95_ms'] > tolerancia_ms
+            if piorou or consultas > 0:
+                regressoes.append(chave)
+                self.stdout.write(self.style.ERROR(linha))
+            else:
+                self.stdout.write(linha)
+        if regressoes:
+            raise CommandError(f'Regressão em: {", ".join(regressoes)}')
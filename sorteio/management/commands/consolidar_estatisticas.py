@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from sorteio.models import EstatisticaDiaria
+
+
+class Command(BaseCommand):
+    help = 'Gera o resumo diário (EstatisticaDiaria) de todos os dias fechados ainda não consolidados'
+
+    def handle(self, *args, **options):
+        consolidados = EstatisticaDiaria.objects.consolidar()
+        self.stdout.write(self.style.SUCCESS(f'{len(consolidados)} dias consolidados.'))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from sorteio.exportacao import EXPORTACOES, FORMATOS, TAMANHO_LOTE, exportar
+
+
+class Command(BaseCommand):
+    help = (
+        'Exporta notas, jogadores ou o sorteio atual em CSV ou NDJSON, em fluxo (memória constante). '
+        'Para backup no cron: python manage.py exportar_dados avaliacoes --saida avaliacoes.csv'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('tipo', choices=sorted(EXPORTACOES))
+        parser.add_argument('--formato', choices=sorted(FORMATOS), default='csv')
+        parser.add_argument('--saida', help='Arquivo de destino (padrão: saída padrão)')
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE, help='Linhas lidas do banco por vez')
+
+    def handle(self, *args, **options):
+        pedacos = exportar(options['tipo'], options['formato'], options['lote'])
+        if not options['saida']:
+            for pedaco in pedacos:
+                self.stdout.write(pedaco, ending='')
+            return
+        with open(options['saida'], 'w', encoding='utf-8', newline='') as arquivo:
+            arquivo.writelines(pedacos)
+        self.stdout.write(self.style.SUCCESS(f'{options["tipo"]} exportado para {options["saida"]}.'))
@@ -0,0 +1,79 @@
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Avg
+from django.utils import timezone
+from sorteio.models import Avaliacao, Votante, intervalo_do_dia
+
+
+class Command(BaseCommand):
+    help = (
+        'Cria um banco de teste descartável com avaliações sintéticas e mostra o plano '
+        '(EXPLAIN) e o tempo das consultas "de hoje" no formato antigo (__date) e no novo (faixa)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--avaliacoes', type=int, default=1_000_000)
+        parser.add_argument('--jogadores', type=int, default=200)
+        parser.add_argument('--dias', type=int, default=365)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        nome_original = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self._semear(options)
+            self._comparar()
+        finally:
+            connection.creation.destroy_test_db(nome_original, verbosity=0)
+
+    def _semear(self, options):
+        num_jogadores = options['jogadores']
+        call_command(
+            'popular_banco',
+            votantes=-(-options['avaliacoes'] // num_jogadores),
+            jogadores=num_jogadores,
+            avaliacoes=options['avaliacoes'],
+            dias=options['dias'],
+            seed=options['seed'],
+            stdout=self.stdout,
+        )
+
+    def _comparar(self):
+        votante = Votante.objects.order_by('-id').first()
+        hoje = timezone.localdate()
+        intervalo = intervalo_do_dia(hoje)
+        consultas = [
+            (
+                'Votante.ja_votou_hoje',
+                lambda: Avaliacao.objects.filter(avaliador=votante, data_avaliacao__date=hoje),
+                lambda: Avaliacao.objects.do_dia(intervalo).filter(avaliador=votante),
+            ),
+            (
+                'Votos de hoje (dashboard)',
+                lambda: Avaliacao.objects.filter(data_avaliacao__date=hoje),
+                lambda: Avaliacao.objects.do_dia(intervalo),
+            ),
+            (
+                'Votantes ativos hoje (dashboard)',
+                lambda: Avaliacao.objects.filter(data_avaliacao__date=hoje).values('avaliador').distinct(),
+                lambda: Avaliacao.objects.do_dia(intervalo).values('avaliador').distinct(),
+            ),
+        ]
+        for titulo, antiga, nova in consultas:
+            self.stdout.write(self.style.MIGRATE_HEADING(titulo))
+            for rotulo, consulta in (('antes (__date)', antiga), ('depois (faixa)', nova)):
+                self._mostrar(rotulo, consulta())
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Média por jogador (índice jogador, nota)'))
+        self._mostrar('agregado', Avaliacao.objects.values('jogador').annotate(media=Avg('nota')).order_by())
+
+    def _mostrar(self, rotulo, queryset):
+        inicio = time.perf_counter()
+        linhas = queryset.count()
+        decorrido = (time.perf_counter() - inicio) * 1000
+        self.stdout.write(f'  {rotulo}: {linhas} linhas em {decorrido:.1f} ms')
+        for linha in queryset.explain().splitlines():
+            self.stdout.write(f'    {linha}')
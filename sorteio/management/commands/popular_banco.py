@@ -0,0 +1,88 @@
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from sorteio import cache
+from sorteio.models import Avaliacao, EstatisticaJogador, Jogador, Rodada, Votante
+
+TAMANHO_LOTE = 50_000
+
+
+class Command(BaseCommand):
+    help = 'Popula o banco com votantes, jogadores e avaliações sintéticos usando inserções em lote'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--votantes', type=int, default=100)
+        parser.add_argument('--jogadores', type=int, default=24)
+        parser.add_argument(
+            '--avaliacoes', type=int, default=None,
+            help='Total de avaliações (padrão: todo votante avalia todo jogador)',
+        )
+        parser.add_argument('--dias', type=int, default=1, help='Espalha as avaliações pelos últimos N dias')
+        parser.add_argument('--prefixo', default='sintetico')
+        parser.add_argument('--senha', default='senha-sintetica', help='Senha de todos os votantes criados')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        gerador = random.Random(options['seed'])
+        prefixo = options['prefixo']
+        num_votantes = options['votantes']
+        num_jogadores = options['jogadores']
+        total = options['avaliacoes']
+        if total is None:
+            total = num_votantes * num_jogadores
+        total = min(total, num_votantes * num_jogadores)
+
+        # Uma única derivação de senha para todos os votantes
+        senha = make_password(options['senha'])
+        Jogador.objects.bulk_create(
+            (Jogador(nome=f'{prefixo} jogador {i}') for i in range(num_jogadores)),
+            batch_size=1000, ignore_conflicts=True,
+        )
+        Votante.objects.bulk_create(
+            (Votante(username=f'{prefixo}{i}', nome_completo=f'{prefixo} votante {i}', password=senha)
+             for i in range(num_votantes)),
+            batch_size=1000, ignore_conflicts=True,
+        )
+        jogadores = list(Jogador.objects.filter(nome__startswith=f'{prefixo} jogador ').values_list('id', flat=True))
+        votantes = list(Votante.objects.filter(username__startswith=prefixo).values_list('id', flat=True))
+
+        # Inserção direta: bulk_create sobrescreveria data_avaliacao (auto_now_add)
+        agora = timezone.now()
+        Rodada.objects.bulk_create(
+            (Rodada(dia=timezone.localdate(agora) - timedelta(days=d)) for d in range(options['dias'] + 1)),
+            ignore_conflicts=True,
+        )
+        tabela = connection.ops.quote_name(Avaliacao._meta.db_table)
+        sql = (
+            f'INSERT INTO {tabela} (rodada_id, avaliador_id, jogador_id, nota, data_avaliacao) '
+            'VALUES (%s, %s, %s, %s, %s) ON CONFLICT DO NOTHING'
+        )
+        pares = gerador.sample(range(len(votantes) * len(jogadores)), total)
+        with transaction.atomic(), connection.cursor() as cursor:
+            for inicio in range(0, total, TAMANHO_LOTE):
+                lote = []
+                for par in pares[inicio:inicio + TAMANHO_LOTE]:
+                    votante, jogador = divmod(par, len(jogadores))
+                    data = agora - timedelta(
+                        days=gerador.randrange(options['dias']),
+                        seconds=gerador.randrange(3600),
+                    )
+                    lote.append((
+                        connection.ops.adapt_datefield_value(timezone.localdate(data)),
+                        votantes[votante], jogadores[jogador], gerador.randint(0, 10),
+                        connection.ops.adapt_datetimefield_value(data),
+                    ))
+                cursor.executemany(sql, lote)
+            EstatisticaJogador.objects.reconstruir()
+            cache.invalidar()
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(votantes)} votantes, {len(jogadores)} jogadores e {total} avaliações sintéticos prontos.'
+        ))
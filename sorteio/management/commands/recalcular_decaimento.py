@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from sorteio.models import EstatisticaJogador
+
+
+class Command(BaseCommand):
+    help = (
+        'Refaz a média com decaimento (SORTEIO_MEIA_VIDA_DIAS) de cada jogador em uma única passada '
+        'pelas notas; rode depois de mudar a meia-vida'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=5000, help='Linhas lidas do banco por vez')
+
+    def handle(self, *args, **options):
+        total = EstatisticaJogador.objects.recalcular_decaimento(options['lote'])
+        self.stdout.write(self.style.SUCCESS(f'Média com decaimento recalculada para {total} jogadores.'))
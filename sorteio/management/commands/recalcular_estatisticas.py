@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from sorteio.models import EstatisticaJogador
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói do zero o agregado de notas de cada jogador a partir das avaliações'
+
+    def handle(self, *args, **options):
+        total = EstatisticaJogador.objects.reconstruir()
+        self.stdout.write(self.style.SUCCESS(f'{total} agregados de jogadores recalculados.'))
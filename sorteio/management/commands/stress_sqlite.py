@@ -0,0 +1,116 @@
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from multiprocessing import Pool
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+ESQUEMA = '''
+CREATE TABLE avaliacao (
+    avaliador_id INTEGER NOT NULL,
+    jogador_id INTEGER NOT NULL,
+    nota INTEGER NOT NULL,
+    UNIQUE (avaliador_id, jogador_id)
+);
+CREATE TABLE estatistica (
+    jogador_id INTEGER PRIMARY KEY,
+    soma INTEGER NOT NULL DEFAULT 0,
+    votos INTEGER NOT NULL DEFAULT 0
+);
+'''
+
+
+def _conectar(caminho, modo):
+    if modo == 'ajustado':
+        pragmas = settings.SQLITE_PRAGMAS
+        conexao = sqlite3.connect(caminho, timeout=pragmas['busy_timeout'] / 1000, isolation_level=None)
+        for nome, valor in pragmas.items():
+            conexao.execute(f'PRAGMA {nome}={valor}')
+    else:
+        # Comportamento anterior: journal padrão, synchronous=FULL, BEGIN adiado
+        conexao = sqlite3.connect(caminho, isolation_level=None)
+    return conexao
+
+
+def _escritor(argumentos):
+    """Um processo gravando votos como a view faz: lê a nota anterior, faz o upsert e ajusta o agregado"""
+    caminho, modo, votante, votos, jogadores, seed = argumentos
+    gerador = random.Random(seed)
+    conexao = _conectar(caminho, modo)
+    begin = 'BEGIN IMMEDIATE' if modo == 'ajustado' else 'BEGIN'
+    confirmados, erros, latencias = 0, 0, []
+    for _ in range(votos):
+        jogador = gerador.randrange(jogadores)
+        nota = gerador.randint(0, 10)
+        inicio = time.perf_counter()
+        try:
+            conexao.execute(begin)
+            anterior = conexao.execute(
+                'SELECT nota FROM avaliacao WHERE avaliador_id = ? AND jogador_id = ?', (votante, jogador)
+            ).fetchone()
+            conexao.execute(
+                'INSERT INTO avaliacao (avaliador_id, jogador_id, nota) VALUES (?, ?, ?) '
+                'ON CONFLICT (avaliador_id, jogador_id) DO UPDATE SET nota = excluded.nota',
+                (votante, jogador, nota),
+            )
+            conexao.execute(
+                'UPDATE estatistica SET soma = soma + ?, votos = votos + ? WHERE jogador_id = ?',
+                (nota - (anterior[0] if anterior else 0), 0 if anterior else 1, jogador),
+            )
+            conexao.execute('COMMIT')
+            confirmados += 1
+            latencias.append(time.perf_counter() - inicio)
+        except sqlite3.OperationalError:
+            erros += 1
+            if conexao.in_transaction:
+                conexao.execute('ROLLBACK')
+    conexao.close()
+    return confirmados, erros, latencias
+
+
+class Command(BaseCommand):
+    help = (
+        'Teste de estresse com processos gravando votos em paralelo num SQLite temporário, '
+        'comparando a configuração anterior com os PRAGMAs de SQLITE_PRAGMAS e BEGIN IMMEDIATE'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processos', type=int, nargs='+', default=[2, 4, 8])
+        parser.add_argument('--votos', type=int, default=300, help='Votos por processo')
+        parser.add_argument('--jogadores', type=int, default=24)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'modo':<10}{'processos':>10}{'confirmados':>13}{'erros de lock':>15}"
+            f"{'votos/s':>10}{'p95 ms':>10}"
+        )
+        for processos in options['processos']:
+            for modo in ('anterior', 'ajustado'):
+                self._rodar(modo, processos, options['votos'], options['jogadores'])
+
+    def _rodar(self, modo, processos, votos, jogadores):
+        with tempfile.TemporaryDirectory() as diretorio:
+            caminho = os.path.join(diretorio, 'stress.sqlite3')
+            conexao = sqlite3.connect(caminho)
+            conexao.executescript(ESQUEMA)
+            conexao.executemany('INSERT INTO estatistica (jogador_id) VALUES (?)', [(j,) for j in range(jogadores)])
+            conexao.commit()
+            conexao.close()
+
+            tarefas = [(caminho, modo, p, votos, jogadores, p) for p in range(processos)]
+            inicio = time.perf_counter()
+            with Pool(processos) as pool:
+                resultados = pool.map(_escritor, tarefas)
+            decorrido = time.perf_counter() - inicio
+
+        confirmados = sum(r[0] for r in resultados)
+        erros = sum(r[1] for r in resultados)
+        latencias = sorted(l for r in resultados for l in r[2])
+        p95 = latencias[int(len(latencias) * 0.95) - 1] * 1000 if latencias else 0
+        self.stdout.write(
+            f'{modo:<10}{processos:>10}{confirmados:>13}{erros:>15}'
+            f'{confirmados / decorrido:>10.0f}{p95:>10.1f}'
+        )
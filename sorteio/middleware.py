@@ -0,0 +1,211 @@
+import contextvars
+import functools
+import json
+import logging
+import mimetypes
+import os
+import time
+from contextlib import ExitStack
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import (
+    FileResponse, HttpResponse, HttpResponseNotAllowed, HttpResponseNotFound, HttpResponseNotModified,
+)
+from django.template.backends.django import Template as DjangoTemplate
+
+from .estaticos import CODIFICACOES
+
+logger = logging.getLogger('sorteio.medicao')
+
+_medicao_atual = contextvars.ContextVar('medicao_atual', default=None)
+
+
+class Medicao:
+    """Custos acumulados de uma requisição"""
+    __slots__ = ('consultas', 'tempo_banco', 'tempo_templates', 'profundidade_template')
+
+    def __init__(self):
+        self.consultas = 0
+        self.tempo_banco = 0.0
+        self.tempo_templates = 0.0
+        self.profundidade_template = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # Assinatura exigida por connection.execute_wrapper
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.tempo_banco += time.perf_counter() - inicio
+            self.consultas += 1
+
+
+def _instrumentar_templates():
+    """Envolve a renderação dos templates Django para medir o tempo gasto nela"""
+    original = DjangoTemplate.render
+    if getattr(original, 'instrumentado', False):
+        return
+
+    @functools.wraps(original)
+    def render(self, context=None, request=None):
+        medicao = _medicao_atual.get()
+        if medicao is None:
+            return original(self, context, request)
+        # Widgets de formulário também renderizam templates: só conta o mais externo
+        medicao.profundidade_template += 1
+        inicio = time.perf_counter()
+        try:
+            return original(self, context, request)
+        finally:
+            medicao.profundidade_template -= 1
+            if not medicao.profundidade_template:
+                medicao.tempo_templates += time.perf_counter() - inicio
+
+    render.instrumentado = True
+    DjangoTemplate.render = render
+
+
+class MedicaoRequisicaoMiddleware:
+    """Conta consultas e mede tempo de banco e de templates por requisição.
+
+    Ligado por MEDICAO_REQUISICOES; desligado, o middleware se remove da
+    cadeia (MiddlewareNotUsed) e não custa nada. Ligado, adiciona os cabeçalhos
+    Server-Timing e X-Query-Count e registra uma linha JSON por requisição no
+    logger 'sorteio.medicao'.
+    """
+    def __init__(self, get_response):
+        if not getattr(settings, 'MEDICAO_REQUISICOES', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        _instrumentar_templates()
+
+    def __call__(self, request):
+        medicao = Medicao()
+        token = _medicao_atual.set(medicao)
+        inicio = time.perf_counter()
+        try:
+            with ExitStack() as pilha:
+                for conexao in connections.all():
+                    pilha.enter_context(conexao.execute_wrapper(medicao))
+                response = self.get_response(request)
+        finally:
+            _medicao_atual.reset(token)
+        total = (time.perf_counter() - inicio) * 1000
+        banco = medicao.tempo_banco * 1000
+        templates = medicao.tempo_templates * 1000
+
+        response['Server-Timing'] = (
+            f'db;dur={banco:.1f};desc="{medicao.consultas} consultas", '
+            f'tpl;dur={templates:.1f}, '
+            f'total;dur={total:.1f}'
+        )
+        response['X-Query-Count'] = str(medicao.consultas)
+
+        resolver_match = getattr(request, 'resolver_match', None)
+        logger.info(json.dumps({
+            'url_name': resolver_match.view_name if resolver_match else None,
+            'metodo': request.method,
+            'caminho': request.path,
+            'status': response.status_code,
+            'consultas': medicao.consultas,
+            'db_ms': round(banco, 2),
+            'templates_ms': round(templates, 2),
+            'total_ms': round(total, 2),
+        }))
+        return response
+
+
+class ArquivoEstatico:
+    """Um arquivo do STATIC_ROOT e suas versões comprimidas, lidos uma vez na inicialização"""
+    __slots__ = ('caminho', 'content_type', 'imutavel', 'variantes')
+
+    def __init__(self, caminho, imutavel):
+        self.caminho = caminho
+        self.content_type = mimetypes.guess_type(caminho)[0] or 'application/octet-stream'
+        self.imutavel = imutavel
+        # Content-Encoding ('' = original) -> (caminho, tamanho, etag), na ordem de preferência
+        self.variantes = {}
+        for extensao, codificacao in CODIFICACOES.items():
+            if os.path.exists(caminho + extensao):
+                self.variantes[codificacao] = self._variante(caminho + extensao)
+        self.variantes[''] = self._variante(caminho)
+
+    @staticmethod
+    def _variante(caminho):
+        info = os.stat(caminho)
+        return caminho, info.st_size, f'"{info.st_mtime_ns:x}-{info.st_size:x}"'
+
+    def escolher(self, accept_encoding):
+        aceitas = {
+            parte.split(';')[0].strip()
+            for parte in accept_encoding.lower().split(',')
+            if not parte.replace(' ', '').endswith(';q=0')
+        }
+        for codificacao, variante in self.variantes.items():
+            if not codificacao or codificacao in aceitas:
+                return codificacao, variante
+
+
+class ServirEstaticosMiddleware:
+    """Serve o STATIC_ROOT antes de sessão, autenticação, URLs e banco.
+
+    A lista de arquivos é montada uma vez na inicialização (rode collectstatic
+    antes de subir o servidor). Arquivos com hash no nome (do manifest) recebem
+    cache de um ano com 'immutable'; os demais, um cache curto. Quando há versão
+    .br ou .gz e o cliente aceita, ela é enviada com Content-Encoding e
+    'Vary: Accept-Encoding'. Sem STATIC_ROOT coletado o middleware se remove.
+    """
+    CACHE_IMUTAVEL = 'public, max-age=31536000, immutable'
+    CACHE_CURTO = 'public, max-age=60'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        url = urlsplit(settings.STATIC_URL or '')
+        raiz = settings.STATIC_ROOT
+        # Estáticos num CDN (URL absoluta) ou ainda não coletados: nada a servir
+        if url.netloc or not url.path or not raiz or not os.path.isdir(raiz):
+            raise MiddlewareNotUsed
+        self.prefixo = url.path
+        self.arquivos = self._indexar(raiz)
+
+    def _indexar(self, raiz):
+        hashed = set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+        arquivos = {}
+        for diretorio, _, nomes in os.walk(raiz):
+            for nome in nomes:
+                if os.path.splitext(nome)[1] in CODIFICACOES or nome == 'staticfiles.json':
+                    continue
+                caminho = os.path.join(diretorio, nome)
+                relativo = os.path.relpath(caminho, raiz).replace(os.sep, '/')
+                arquivos[self.prefixo + relativo] = ArquivoEstatico(caminho, relativo in hashed)
+        return arquivos
+
+    def __call__(self, request):
+        if not request.path_info.startswith(self.prefixo):
+            return self.get_response(request)
+        arquivo = self.arquivos.get(request.path_info)
+        if arquivo is None:
+            return HttpResponseNotFound()
+        if request.method not in ('GET', 'HEAD'):
+            return HttpResponseNotAllowed(['GET', 'HEAD'])
+
+        codificacao, (caminho, tamanho, etag) = arquivo.escolher(request.headers.get('Accept-Encoding', ''))
+        if request.headers.get('If-None-Match') == etag:
+            response = HttpResponseNotModified()
+        elif request.method == 'HEAD':
+            response = HttpResponse(content_type=arquivo.content_type)
+            response['Content-Length'] = tamanho
+        else:
+            response = FileResponse(open(caminho, 'rb'), content_type=arquivo.content_type)
+            del response['Content-Disposition']
+        if codificacao and response.status_code == 200:
+            response['Content-Encoding'] = codificacao
+        if len(arquivo.variantes) > 1:
+            response['Vary'] = 'Accept-Encoding'
+        response['ETag'] = etag
+        response['Cache-Control'] = self.CACHE_IMUTAVEL if arquivo.imutavel else self.CACHE_CURTO
+        return response
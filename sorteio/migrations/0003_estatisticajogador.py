@@ -0,0 +1,48 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+
+
+def preencher_estatisticas(apps, schema_editor):
+    Avaliacao = apps.get_model('sorteio', 'Avaliacao')
+    EstatisticaJogador = apps.get_model('sorteio', 'EstatisticaJogador')
+    linhas = Avaliacao.objects.values('jogador_id').annotate(
+        soma=Sum('nota'),
+        total=Count('id'),
+        quadrados=Sum(F('nota') * F('nota')),
+    ).order_by()
+    EstatisticaJogador.objects.bulk_create(
+        EstatisticaJogador(
+            jogador_id=linha['jogador_id'],
+            soma_notas=linha['soma'],
+            total_votos=linha['total'],
+            soma_quadrados=linha['quadrados'],
+        )
+        for linha in linhas
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sorteio', '0002_votante_email'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstatisticaJogador',
+            fields=[
+                ('jogador', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='estatistica', serialize=False, to='sorteio.jogador')),
+                ('soma_notas', models.BigIntegerField(default=0)),
+                ('total_votos', models.PositiveIntegerField(default=0)),
+                ('soma_quadrados', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Estatística do Jogador',
+                'verbose_name_plural': 'Estatísticas dos Jogadores',
+            },
+        ),
+        migrations.RunPython(preencher_estatisticas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sorteio', '0003_estatisticajogador'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='avaliacao',
+            index=models.Index(fields=['avaliador', 'data_avaliacao'], name='avaliacao_avaliador_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='avaliacao',
+            index=models.Index(fields=['data_avaliacao'], name='avaliacao_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='avaliacao',
+            index=models.Index(fields=['jogador', 'nota'], name='avaliacao_jogador_nota_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sorteio', '0004_avaliacao_indices'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstatisticaDiaria',
+            fields=[
+                ('dia', models.DateField(primary_key=True, serialize=False)),
+                ('total_votos', models.PositiveIntegerField(default=0)),
+                ('votantes_ativos', models.PositiveIntegerField(default=0)),
+                ('jogadores_avaliados', models.PositiveIntegerField(default=0)),
+                ('soma_notas', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Estatística Diária',
+                'verbose_name_plural': 'Estatísticas Diárias',
+                'ordering': ('-dia',),
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:10
+
+import django.db.models.deletion
+from datetime import datetime, time, timedelta
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def preencher_rodadas(apps, schema_editor):
+    Avaliacao = apps.get_model('sorteio', 'Avaliacao')
+    Rodada = apps.get_model('sorteio', 'Rodada')
+    dias = Avaliacao.objects.annotate(dia=TruncDate('data_avaliacao')).values_list('dia', flat=True).distinct()
+    for dia in dias.order_by('dia'):
+        Rodada.objects.create(dia=dia)
+        inicio = timezone.make_aware(datetime.combine(dia, time.min))
+        Avaliacao.objects.filter(
+            data_avaliacao__gte=inicio, data_avaliacao__lt=inicio + timedelta(days=1)
+        ).update(rodada_id=dia)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sorteio', '0005_estatisticadiaria'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Rodada',
+            fields=[
+                ('dia', models.DateField(primary_key=True, serialize=False)),
+                ('arquivada', models.BooleanField(default=False)),
+            ],
+            options={
+                'verbose_name': 'Rodada',
+                'verbose_name_plural': 'Rodadas',
+                'ordering': ('-dia',),
+            },
+        ),
+        migrations.AddField(
+            model_name='avaliacao',
+            name='rodada',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='avaliacoes', to='sorteio.rodada'),
+        ),
+        migrations.RunPython(preencher_rodadas, migrations.RunPython.noop),
+    ]
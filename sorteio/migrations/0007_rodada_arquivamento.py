@@ -0,0 +1,57 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sorteio', '0006_rodada'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='avaliacao',
+            name='rodada',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='avaliacoes', to='sorteio.rodada'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='avaliacao',
+            unique_together={('rodada', 'avaliador', 'jogador')},
+        ),
+        migrations.CreateModel(
+            name='AvaliacaoArquivada',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('nota', models.IntegerField()),
+                ('data_avaliacao', models.DateTimeField()),
+                ('avaliador', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('jogador', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='sorteio.jogador')),
+                ('rodada', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='avaliacoes_arquivadas', to='sorteio.rodada')),
+            ],
+            options={
+                'verbose_name': 'Avaliação Arquivada',
+                'verbose_name_plural': 'Avaliações Arquivadas',
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumoRodadaJogador',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_votos', models.PositiveIntegerField(default=0)),
+                ('soma_notas', models.BigIntegerField(default=0)),
+                ('soma_quadrados', models.BigIntegerField(default=0)),
+                ('nota_minima', models.IntegerField()),
+                ('nota_maxima', models.IntegerField()),
+                ('jogador', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumos_rodadas', to='sorteio.jogador')),
+                ('rodada', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='resumos', to='sorteio.rodada')),
+            ],
+            options={
+                'verbose_name': 'Resumo da Rodada por Jogador',
+                'verbose_name_plural': 'Resumos das Rodadas por Jogador',
+                'unique_together': {('rodada', 'jogador')},
+            },
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:18
+
+from itertools import chain
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def preencher_decaimento(apps, schema_editor):
+    # Mesma conta de EstatisticaJogador.objects.recalcular_decaimento, com os modelos históricos
+    EstatisticaJogador = apps.get_model('sorteio', 'EstatisticaJogador')
+    Avaliacao = apps.get_model('sorteio', 'Avaliacao')
+    ResumoRodadaJogador = apps.get_model('sorteio', 'ResumoRodadaJogador')
+    hoje = timezone.localdate().toordinal()
+    meia_vida = getattr(settings, 'SORTEIO_MEIA_VIDA_DIAS', 90)
+    estados = {}
+    linhas = chain(
+        ResumoRodadaJogador.objects.values_list('jogador_id', 'rodada_id', 'soma_notas', 'total_votos').iterator(),
+        ((j, dia, nota, 1) for j, dia, nota in Avaliacao.objects.values_list('jogador_id', 'rodada_id', 'nota').iterator()),
+    )
+    for jogador_id, dia, soma, total in linhas:
+        fator = 0.5 ** ((hoje - dia.toordinal()) / meia_vida)
+        estado = estados.setdefault(jogador_id, [0.0, 0.0])
+        estado[0] += soma * fator
+        estado[1] += total * fator
+    for jogador_id, (nota, peso) in estados.items():
+        EstatisticaJogador.objects.filter(jogador_id=jogador_id).update(
+            nota_decaida=nota, peso_decaido=peso, dia_decaimento=hoje
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sorteio', '0007_rodada_arquivamento'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='estatisticajogador',
+            name='dia_decaimento',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='estatisticajogador',
+            name='nota_decaida',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='estatisticajogador',
+            name='peso_decaido',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(preencher_decaimento, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sorteio', '0008_estatistica_decaimento'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jogador',
+            name='posicao',
+            field=models.CharField(blank=True, choices=[('goleiro', 'Goleiro'), ('defensor', 'Defensor'), ('meio', 'Meio-campo'), ('atacante', 'Atacante')], default='', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='RestricaoPar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('separar', 'Times diferentes'), ('juntar', 'Mesmo time')], default='separar', max_length=10)),
+                ('jogador_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='sorteio.jogador')),
+                ('jogador_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='sorteio.jogador')),
+            ],
+            options={
+                'verbose_name': 'Restrição de Par',
+                'verbose_name_plural': 'Restrições de Pares',
+                'ordering': ('id',),
+                'unique_together': {('jogador_a', 'jogador_b')},
+            },
+        ),
+    ]
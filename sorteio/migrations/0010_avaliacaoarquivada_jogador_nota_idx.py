@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sorteio', '0009_jogador_posicao_restricaopar'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='avaliacaoarquivada',
+            index=models.Index(fields=['jogador', 'nota'], name='arquivada_jogador_nota_idx'),
+        ),
+    ]
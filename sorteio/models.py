@@ -1,8 +1,29 @@
-from django.db import models
+from itertools import chain
+
+from django.conf import settings
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import (
+    BigIntegerField, Case, Count, Exists, F, FloatField, Func, IntegerField, Max, Min, OuterRef, Q, Subquery, Sum,
+    Value, When,
+)
+from django.db.models.functions import Cast, Coalesce, Greatest, NullIf, Power, TruncDate
 from django.contrib.auth.models import AbstractUser
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
-from datetime import date
+from datetime import datetime, time, timedelta
+from . import cache
+
+
+def intervalo_do_dia(dia=None):
+    """Intervalo [início, fim) de um dia no fuso configurado (hoje por padrão).
+
+    Filtrar por faixa de datetime permite ao banco usar o índice de
+    data_avaliacao, ao contrário de data_avaliacao__date, que converte a coluna.
+    """
+    dia = dia or timezone.localdate()
+    inicio = timezone.make_aware(datetime.combine(dia, time.min))
+    return inicio, timezone.make_aware(datetime.combine(dia + timedelta(days=1), time.min))
 
 class Votante(AbstractUser):
     """Modelo para os votantes (usuários que dão notas)"""
@@ -16,57 +37,673 @@ class Votante(AbstractUser):
     def __str__(self):
         return self.nome_completo
     
-    def ja_votou_hoje(self):
+    def get_session_auth_hash(self):
+        # O snapshot em cache (ver backends.py) já traz o hash, sem carregar a senha
+        return self.__dict__.get('hash_sessao') or super().get_session_auth_hash()
+    
+    def progresso_hoje(self, intervalo=None):
+        """Progresso da votação de hoje, carregado em uma única consulta"""
+        feitas_hoje = Avaliacao.objects.do_dia(intervalo).filter(avaliador=self, jogador=OuterRef('pk'))
+        jogadores = Jogador.objects.filter(ativo=True).annotate(
+            avaliado_hoje=Exists(feitas_hoje)
+        ).order_by('nome')
+        return ProgressoVotacao(list(jogadores))
+    
+    def ja_votou_hoje(self, intervalo=None):
         """Verifica se o votante já votou hoje"""
-        hoje = timezone.now().date()
-        return Avaliacao.objects.filter(
-            avaliador=self,
-            data_avaliacao__date=hoje
-        ).exists()
+        return Avaliacao.objects.do_dia(intervalo).filter(avaliador=self).exists()
     
-    def votou_em_todos_jogadores_hoje(self):
+    def votou_em_todos_jogadores_hoje(self, intervalo=None):
         """Verifica se o votante já votou em todos os jogadores hoje"""
-        hoje = timezone.now().date()
-        total_jogadores = Jogador.objects.filter(ativo=True).count()
-        votos_hoje = Avaliacao.objects.filter(
-            avaliador=self,
-            data_avaliacao__date=hoje
-        ).count()
-        return votos_hoje >= total_jogadores
+        return self.progresso_hoje(intervalo).concluido
+
+class ProgressoVotacao:
+    """Situação da votação de um votante no dia: próximo jogador e contagens"""
+    def __init__(self, jogadores):
+        self.jogadores = jogadores
+        self.total_jogadores = len(jogadores)
+        self.avaliacoes_feitas = sum(1 for j in jogadores if j.avaliado_hoje)
+        self.jogadores_restantes = self.total_jogadores - self.avaliacoes_feitas
+        self.proximo = next((j for j in jogadores if not j.avaliado_hoje), None)
+    
+    @property
+    def concluido(self):
+        return self.proximo is None
+    
+    @property
+    def percentual(self):
+        if not self.total_jogadores:
+            return 0
+        return (self.avaliacoes_feitas / self.total_jogadores) * 100
+
+class JogadorQuerySet(models.QuerySet):
+    def com_medias(self):
+        """Anota media_notas, media_recente e count_votos a partir do agregado materializado"""
+        return self.annotate(
+            count_votos=Coalesce(F('estatistica__total_votos'), 0),
+            media_notas=Cast(F('estatistica__soma_notas'), FloatField()) / NullIf(F('estatistica__total_votos'), 0),
+            media_recente=Case(
+                When(
+                    estatistica__total_votos__gt=0,
+                    then=F('estatistica__nota_decaida') / NullIf(F('estatistica__peso_decaido'), 0.0),
+                ),
+                output_field=FloatField(),
+            ),
+        )
+
+    def importar(self, nomes):
+        """Cadastra de uma vez os nomes ainda não usados; retorna (criados, já existentes).
+
+        Um único INSERT e uma única invalidação do sorteio. Se outro admin
+        cadastrar um dos nomes ao mesmo tempo, o INSERT falha inteiro (em um
+        savepoint) e é refeito sem os nomes que passaram a existir: criados traz
+        só as linhas inseridas por esta chamada.
+        """
+        nomes = list(dict.fromkeys(nome.strip() for nome in nomes if nome.strip()))
+        with transaction.atomic():
+            while True:
+                existentes = set(self.filter(nome__in=nomes).values_list('nome', flat=True))
+                criados = [nome for nome in nomes if nome not in existentes]
+                if not criados:
+                    break
+                try:
+                    with transaction.atomic():
+                        self.bulk_create([Jogador(nome=nome) for nome in criados])
+                except IntegrityError:
+                    continue
+                cache.invalidar()
+                break
+        return criados, sorted(existentes)
+
+    def definir_ativo(self, ativo):
+        """Ativa ou desativa os jogadores em um único UPDATE; retorna quantos mudaram"""
+        with transaction.atomic():
+            total = self.exclude(ativo=ativo).update(ativo=ativo)
+            if total:
+                cache.invalidar()
+        return total
 
 class Jogador(models.Model):
     """Modelo para os jogadores (cadastrados pelo admin)"""
+    POSICOES = [
+        ('goleiro', 'Goleiro'),
+        ('defensor', 'Defensor'),
+        ('meio', 'Meio-campo'),
+        ('atacante', 'Atacante'),
+    ]
+
     nome = models.CharField(max_length=100, unique=True)
     data_cadastro = models.DateTimeField(auto_now_add=True)
     ativo = models.BooleanField(default=True)
+    # O sorteio espalha cada posição entre os times (ver balanceamento.Restricoes)
+    posicao = models.CharField(max_length=20, choices=POSICOES, blank=True, default='')
+
+    objects = JogadorQuerySet.as_manager()
     
     def __str__(self):
         return self.nome
+
+    def _estatistica(self):
+        try:
+            return self.estatistica
+        except ObjectDoesNotExist:
+            return None
     
     @property
     def media_avaliacoes(self):
-        """Calcula a média das avaliações recebidas"""
-        avaliacoes = self.avaliacoes_recebidas.all()
-        if not avaliacoes:
-            return 0
-        return sum(a.nota for a in avaliacoes) / len(avaliacoes)
+        """Média das avaliações recebidas (anotada por com_medias() ou lida do agregado)"""
+        if hasattr(self, 'media_notas'):
+            return self.media_notas or 0
+        estatistica = self._estatistica()
+        return estatistica.media if estatistica else 0
     
     @property
     def total_votos(self):
         """Retorna o total de votos recebidos"""
-        return self.avaliacoes_recebidas.count()
+        if hasattr(self, 'count_votos'):
+            return self.count_votos
+        estatistica = self._estatistica()
+        return estatistica.total_votos if estatistica else 0
+
+class RestricaoPar(models.Model):
+    """Dois jogadores que o sorteio deve pôr em times diferentes ou no mesmo time"""
+    SEPARAR = 'separar'
+    JUNTAR = 'juntar'
+    TIPOS = [
+        (SEPARAR, 'Times diferentes'),
+        (JUNTAR, 'Mesmo time'),
+    ]
+
+    jogador_a = models.ForeignKey(Jogador, on_delete=models.CASCADE, related_name='+')
+    jogador_b = models.ForeignKey(Jogador, on_delete=models.CASCADE, related_name='+')
+    tipo = models.CharField(max_length=10, choices=TIPOS, default=SEPARAR)
+
+    class Meta:
+        unique_together = ('jogador_a', 'jogador_b')
+        ordering = ('id',)
+        verbose_name = 'Restrição de Par'
+        verbose_name_plural = 'Restrições de Pares'
+
+    def __str__(self):
+        return f"{self.get_tipo_display()}: {self.jogador_a} e {self.jogador_b}"
+
+    def clean(self):
+        if self.jogador_a_id and self.jogador_a_id == self.jogador_b_id:
+            raise ValidationError('Escolha dois jogadores diferentes.')
+        invertida = RestricaoPar.objects.filter(jogador_a_id=self.jogador_b_id, jogador_b_id=self.jogador_a_id)
+        if invertida.exclude(pk=self.pk).exists():
+            raise ValidationError('Já existe uma restrição para esse par.')
+
+class RodadaManager(models.Manager):
+    def garantir(self, dia=None):
+        """Cria a rodada do dia se ainda não existir (uma consulta); retorna a chave (o dia)"""
+        dia = dia or timezone.localdate()
+        self.bulk_create([Rodada(dia=dia)], ignore_conflicts=True)
+        return dia
+
+    def arquivar(self, ate=None):
+        """Arquiva as rodadas fechadas (antes de 'ate', exclusive; hoje por padrão).
+
+        Para cada rodada: grava o resumo por jogador (ResumoRodadaJogador), move
+        as avaliações brutas para AvaliacaoArquivada e as apaga da tabela quente
+        sem passar pelos sinais, já que o agregado dos jogadores não muda.
+        """
+        ate = ate or timezone.localdate()
+        arquivadas = []
+        with transaction.atomic():
+            # O resumo diário é lido das avaliações: precisa ser feito antes de movê-las
+            EstatisticaDiaria.objects.consolidar(ate)
+            for rodada in self.select_for_update().filter(dia__lt=ate, arquivada=False).order_by('dia'):
+                rodada._arquivar()
+                arquivadas.append(rodada)
+        return arquivadas
+
+class Rodada(models.Model):
+    """Dia de jogo: as avaliações pertencem à rodada em que foram feitas"""
+    dia = models.DateField(primary_key=True)
+    arquivada = models.BooleanField(default=False)
+
+    objects = RodadaManager()
+
+    class Meta:
+        ordering = ('-dia',)
+        verbose_name = 'Rodada'
+        verbose_name_plural = 'Rodadas'
+
+    def __str__(self):
+        return self.dia.strftime('%d/%m/%Y')
+
+    def _arquivar(self):
+        avaliacoes = Avaliacao.objects.filter(rodada=self)
+        ResumoRodadaJogador.objects.bulk_create(
+            ResumoRodadaJogador(
+                rodada=self,
+                jogador_id=linha['jogador_id'],
+                total_votos=linha['total'],
+                soma_notas=linha['soma'],
+                soma_quadrados=linha['quadrados'],
+                nota_minima=linha['minima'],
+                nota_maxima=linha['maxima'],
+            )
+            for linha in avaliacoes.values('jogador_id').annotate(
+                total=Count('id'),
+                soma=Sum('nota'),
+                quadrados=Sum(F('nota') * F('nota')),
+                minima=Min('nota'),
+                maxima=Max('nota'),
+            ).order_by()
+        )
+        # INSERT ... SELECT e DELETE direto no banco: as linhas não passam pelo Python
+        colunas = ', '.join(
+            connection.ops.quote_name(campo.column) for campo in AvaliacaoArquivada._meta.concrete_fields
+        )
+        quente = connection.ops.quote_name(Avaliacao._meta.db_table)
+        arquivo = connection.ops.quote_name(AvaliacaoArquivada._meta.db_table)
+        rodada = connection.ops.quote_name(Avaliacao._meta.get_field('rodada').column)
+        dia = connection.ops.adapt_datefield_value(self.dia)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {arquivo} ({colunas}) SELECT {colunas} FROM {quente} WHERE {rodada} = %s', [dia]
+            )
+            cursor.execute(f'DELETE FROM {quente} WHERE {rodada} = %s', [dia])
+        self.arquivada = True
+        self.save(update_fields=['arquivada'])
+
+class _SubconsultaEscalar(Subquery):
+    """Subconsulta sem correlação aceita por aggregate() ao lado das agregações.
+
+    aggregate() recusa expressões que não são agregações, e contains_aggregate
+    só serve para passar por essa checagem. É seguro porque a subconsulta não
+    referencia a consulta externa: vale uma constante por consulta, como um
+    COUNT sem GROUP BY. Não use em annotate(), onde o sinal mudaria o GROUP BY.
+    """
+    contains_aggregate = True
+
+def _contagem(queryset):
+    """COUNT(*) de outro queryset como subconsulta escalar"""
+    contagem = queryset.order_by().annotate(total=Func(F('pk'), function='COUNT')).values('total')
+    return _SubconsultaEscalar(contagem[:1], output_field=IntegerField())
+
+def _soma(queryset, campo):
+    """SUM(campo) de outro queryset como subconsulta escalar (0 se vazio)"""
+    soma = queryset.order_by().annotate(total=Func(F(campo), function='SUM')).values('total')
+    return Coalesce(_SubconsultaEscalar(soma[:1], output_field=IntegerField()), 0)
+
+class AvaliacaoQuerySet(models.QuerySet):
+    def do_dia(self, intervalo=None):
+        """Avaliações feitas dentro do intervalo (hoje por padrão)"""
+        inicio, fim = intervalo or intervalo_do_dia()
+        return self.filter(data_avaliacao__gte=inicio, data_avaliacao__lt=fim)
+
+    def numeros_do_painel(self, intervalo=None):
+        """Números ao vivo do dashboard em uma única consulta (agregação condicional)"""
+        inicio, fim = intervalo or intervalo_do_dia()
+        do_dia = Q(data_avaliacao__gte=inicio, data_avaliacao__lt=fim)
+        return self.aggregate(
+            # Rodadas arquivadas entram pelo resumo por jogador
+            total_votos=Count('id') + _soma(ResumoRodadaJogador.objects.all(), 'total_votos'),
+            votos_hoje=Count('id', filter=do_dia),
+            votantes_ativos_hoje=Count('avaliador', filter=do_dia, distinct=True),
+            total_jogadores=_contagem(Jogador.objects.filter(ativo=True)),
+            total_votantes=_contagem(Votante.objects.filter(is_superuser=False)),
+        )
+
+    def registrar_notas(self, avaliador, notas):
+        """Grava {jogador_id: nota} do avaliador com um único upsert (ON CONFLICT DO UPDATE).
+
+        Reenvios e envios simultâneos da mesma nota apenas a sobrescrevem, sem
+        IntegrityError. O agregado dos jogadores é ajustado antes, na mesma
+        transação, comparando no próprio banco com a nota anterior do avaliador
+        na rodada de hoje.
+        """
+        with transaction.atomic():
+            rodada_id = Rodada.objects.garantir()
+            avaliacoes = [
+                Avaliacao(rodada_id=rodada_id, avaliador=avaliador, jogador_id=jogador_id, nota=nota)
+                for jogador_id, nota in notas.items()
+            ]
+            if connection.features.has_select_for_update:
+                # Serializa as gravações do mesmo avaliador (no SQLite a transação já é exclusiva)
+                list(Votante.objects.select_for_update().filter(pk=avaliador.pk).values_list('pk'))
+            EstatisticaJogador.objects.aplicar_notas_do_avaliador(avaliador.pk, notas, rodada_id)
+            self.bulk_create(
+                avaliacoes,
+                update_conflicts=True,
+                unique_fields=['rodada', 'avaliador', 'jogador'],
+                update_fields=['nota', 'data_avaliacao'],
+            )
+            cache.invalidar()
+        return avaliacoes
 
 class Avaliacao(models.Model):
     """Modelo para as avaliações (notas dos votantes para os jogadores)"""
+    rodada = models.ForeignKey(Rodada, on_delete=models.PROTECT, related_name='avaliacoes')
     avaliador = models.ForeignKey(Votante, on_delete=models.CASCADE, related_name='avaliacoes_feitas')
     jogador = models.ForeignKey(Jogador, on_delete=models.CASCADE, related_name='avaliacoes_recebidas')
     nota = models.IntegerField(validators=[MinValueValidator(0), MaxValueValidator(10)])
     data_avaliacao = models.DateTimeField(auto_now_add=True)
 
+    objects = AvaliacaoQuerySet.as_manager()
+
     class Meta:
-        unique_together = ('avaliador', 'jogador')
+        unique_together = ('rodada', 'avaliador', 'jogador')
+        indexes = [
+            models.Index(fields=['avaliador', 'data_avaliacao'], name='avaliacao_avaliador_data_idx'),
+            models.Index(fields=['data_avaliacao'], name='avaliacao_data_idx'),
+            models.Index(fields=['jogador', 'nota'], name='avaliacao_jogador_nota_idx'),
+        ]
         verbose_name = 'Avaliação'
         verbose_name_plural = 'Avaliações'
 
     def __str__(self):
-        return f"{self.avaliador.nome_completo} -> {self.jogador.nome}: {self.nota}"
\ No newline at end of file
+        return f"{self.avaliador.nome_completo} -> {self.jogador.nome}: {self.nota}"
+
+    def save(self, *args, **kwargs):
+        # A nota e o agregado do jogador são gravados na mesma transação
+        with transaction.atomic():
+            if self.rodada_id is None:
+                self.rodada_id = Rodada.objects.garantir()
+            anterior = None
+            if not self._state.adding and self.pk:
+                anterior = Avaliacao.objects.filter(pk=self.pk).values_list('jogador_id', 'nota', 'rodada_id').first()
+            super().save(*args, **kwargs)
+            if anterior:
+                EstatisticaJogador.objects.remover_nota(*anterior)
+            EstatisticaJogador.objects.registrar_nota(self.jogador_id, self.nota, self.rodada_id)
+
+class AvaliacaoArquivada(models.Model):
+    """Avaliações brutas das rodadas arquivadas, fora da tabela quente (mesmo id e colunas)"""
+    id = models.BigIntegerField(primary_key=True)
+    rodada = models.ForeignKey(Rodada, on_delete=models.PROTECT, related_name='avaliacoes_arquivadas')
+    avaliador = models.ForeignKey(Votante, on_delete=models.CASCADE, related_name='+')
+    jogador = models.ForeignKey(Jogador, on_delete=models.CASCADE, related_name='+')
+    nota = models.IntegerField()
+    data_avaliacao = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['jogador', 'nota'], name='arquivada_jogador_nota_idx'),
+        ]
+        verbose_name = 'Avaliação Arquivada'
+        verbose_name_plural = 'Avaliações Arquivadas'
+
+    def __str__(self):
+        return f"{self.rodada_id} {self.avaliador_id} -> {self.jogador_id}: {self.nota}"
+
+class ResumoRodadaJogador(models.Model):
+    """Resumo das notas de um jogador em uma rodada arquivada; as médias históricas saem daqui"""
+    rodada = models.ForeignKey(Rodada, on_delete=models.PROTECT, related_name='resumos')
+    jogador = models.ForeignKey(Jogador, on_delete=models.CASCADE, related_name='resumos_rodadas')
+    total_votos = models.PositiveIntegerField(default=0)
+    soma_notas = models.BigIntegerField(default=0)
+    soma_quadrados = models.BigIntegerField(default=0)
+    nota_minima = models.IntegerField()
+    nota_maxima = models.IntegerField()
+
+    class Meta:
+        unique_together = ('rodada', 'jogador')
+        verbose_name = 'Resumo da Rodada por Jogador'
+        verbose_name_plural = 'Resumos das Rodadas por Jogador'
+
+    def __str__(self):
+        return f"{self.rodada_id} {self.jogador_id}: {self.total_votos} votos"
+
+    @property
+    def media(self):
+        return self.soma_notas / self.total_votos if self.total_votos else 0
+
+def meia_vida_dias():
+    return getattr(settings, 'SORTEIO_MEIA_VIDA_DIAS', 90)
+
+def _decaimento(de, ate):
+    """Expressão 0.5 ** ((ate - de) / meia-vida), com os dias em ordinal"""
+    return Power(Value(0.5), Cast(ate - de, FloatField()) / Value(float(meia_vida_dias())))
+
+def _decaimento_para(dia):
+    """Leva o estado decaído (nota_decaida, peso_decaido) até o dia de uma nota.
+
+    Retorna (fator do estado guardado, fator da nota, novo dia_decaimento). O
+    estado só avança no tempo: uma nota de um dia anterior (remoção de uma nota
+    antiga) entra já decaída até o dia guardado.
+    """
+    dia = Value(dia.toordinal())
+    guardado = Coalesce(F('dia_decaimento'), dia)
+    novo_dia = Greatest(guardado, dia)
+    return _decaimento(guardado, novo_dia), _decaimento(dia, novo_dia), novo_dia
+
+# Notas brutas (quente + arquivo) com a posição de cada uma entre as do jogador
+# e quantas notas ele tem; 'corte' é quantas notas saem de cada ponta
+_SQL_NOTAS_ORDENADAS = """
+    WITH notas AS (
+        SELECT {jogador} AS jogador_id, {nota} AS nota FROM {quente}
+        UNION ALL
+        SELECT {jogador}, {nota} FROM {arquivo}
+    ), ordenadas AS (
+        SELECT
+            jogador_id,
+            nota,
+            ROW_NUMBER() OVER (PARTITION BY jogador_id ORDER BY nota) AS posicao,
+            COUNT(*) OVER (PARTITION BY jogador_id) AS total
+        FROM notas
+    ), cortes AS (
+        SELECT jogador_id, nota, posicao, total, total * %s / 100 AS corte FROM ordenadas
+    )
+"""
+
+_SQL_MEDIAS_ROBUSTAS = {
+    'media': """
+        SELECT jogador_id, AVG(nota * 1.0) FROM cortes GROUP BY jogador_id
+    """,
+    'aparada': """
+        SELECT jogador_id, AVG(nota * 1.0) FROM cortes
+        WHERE posicao > corte AND posicao <= total - corte
+        GROUP BY jogador_id
+    """,
+    # Nota do meio, ou média das duas do meio quando o total é par
+    'mediana': """
+        SELECT jogador_id, AVG(nota * 1.0) FROM cortes
+        WHERE posicao IN ((total + 1) / 2, (total + 2) / 2)
+        GROUP BY jogador_id
+    """,
+    'winsorizada': """
+        , limites AS (
+            SELECT
+                jogador_id,
+                nota,
+                MIN(CASE WHEN posicao > corte THEN nota END) OVER (PARTITION BY jogador_id) AS piso,
+                MAX(CASE WHEN posicao <= total - corte THEN nota END) OVER (PARTITION BY jogador_id) AS teto
+            FROM cortes
+        )
+        SELECT jogador_id, AVG(CASE WHEN nota < piso THEN piso WHEN nota > teto THEN teto ELSE nota END * 1.0)
+        FROM limites
+        GROUP BY jogador_id
+    """,
+}
+
+class EstatisticaJogadorManager(models.Manager):
+    def _aplicar(self, jogador_id, nota, sinal, dia):
+        fator_estado, fator_nota, novo_dia = _decaimento_para(dia)
+        return self.filter(jogador_id=jogador_id).update(
+            soma_notas=F('soma_notas') + sinal * nota,
+            total_votos=F('total_votos') + sinal,
+            soma_quadrados=F('soma_quadrados') + sinal * nota * nota,
+            nota_decaida=F('nota_decaida') * fator_estado + fator_nota * (sinal * nota),
+            peso_decaido=F('peso_decaido') * fator_estado + fator_nota * sinal,
+            dia_decaimento=novo_dia,
+        )
+
+    def registrar_nota(self, jogador_id, nota, dia=None):
+        """Soma uma nota (dada no dia da rodada 'dia', hoje por padrão) ao agregado do jogador"""
+        dia = dia or timezone.localdate()
+        if not self._aplicar(jogador_id, nota, 1, dia):
+            self.get_or_create(jogador_id=jogador_id)
+            self._aplicar(jogador_id, nota, 1, dia)
+
+    def remover_nota(self, jogador_id, nota, dia=None):
+        """Retira uma nota (dada no dia da rodada 'dia', hoje por padrão) do agregado do jogador"""
+        self._aplicar(jogador_id, nota, -1, dia or timezone.localdate())
+
+    def aplicar_notas_do_avaliador(self, avaliador_id, notas, rodada_id):
+        """Ajusta os agregados para as novas notas {jogador_id: nota} de um avaliador na rodada.
+
+        Um único UPDATE: a nota anterior do avaliador na rodada (se existir) é
+        lida por subconsulta e descontada, então a chamada deve vir antes do upsert.
+        Como ela é do mesmo dia, sai do estado decaído com o mesmo peso da nova.
+        """
+        if not notas:
+            return
+        self.bulk_create([EstatisticaJogador(jogador_id=j) for j in notas], ignore_conflicts=True)
+        nova = Case(
+            *[When(jogador_id=j, then=Value(nota)) for j, nota in notas.items()],
+            output_field=BigIntegerField(),
+        )
+        anterior = Avaliacao.objects.filter(
+            rodada_id=rodada_id, avaliador_id=avaliador_id, jogador_id=OuterRef('jogador_id')
+        ).values('nota')[:1]
+        nota_anterior = Coalesce(Subquery(anterior), Value(0), output_field=BigIntegerField())
+        voto_novo = Case(When(Exists(anterior), then=Value(0)), default=Value(1))
+        fator_estado, fator_nota, novo_dia = _decaimento_para(rodada_id)
+        self.filter(jogador_id__in=notas).update(
+            soma_notas=F('soma_notas') + nova - nota_anterior,
+            total_votos=F('total_votos') + voto_novo,
+            soma_quadrados=F('soma_quadrados') + nova * nova - nota_anterior * nota_anterior,
+            nota_decaida=F('nota_decaida') * fator_estado + fator_nota * Cast(nova - nota_anterior, FloatField()),
+            peso_decaido=F('peso_decaido') * fator_estado + fator_nota * Cast(voto_novo, FloatField()),
+            dia_decaimento=novo_dia,
+        )
+
+    def recalcular_decaimento(self, tamanho_lote=5000):
+        """Refaz a média com decaimento de todos os jogadores em uma passada pelas notas.
+
+        As avaliações da tabela quente são lidas em fluxo (iterator), sem
+        carregar a tabela na memória, junto com os resumos das rodadas
+        arquivadas; o estado de cada jogador fica ancorado em hoje.
+        """
+        hoje = timezone.localdate().toordinal()
+        meia_vida = meia_vida_dias()
+        estados = {}
+        linhas = chain(
+            ResumoRodadaJogador.objects.values_list('jogador_id', 'rodada_id', 'soma_notas', 'total_votos')
+            .iterator(chunk_size=tamanho_lote),
+            Avaliacao.objects.values_list('jogador_id', 'rodada_id', 'nota', Value(1))
+            .iterator(chunk_size=tamanho_lote),
+        )
+        for jogador_id, dia, soma, total in linhas:
+            fator = 0.5 ** ((hoje - dia.toordinal()) / meia_vida)
+            estado = estados.setdefault(jogador_id, [0.0, 0.0])
+            estado[0] += soma * fator
+            estado[1] += total * fator
+        with transaction.atomic():
+            self.bulk_create([EstatisticaJogador(jogador_id=j) for j in estados], ignore_conflicts=True)
+            self.exclude(jogador_id__in=estados).update(nota_decaida=0, peso_decaido=0, dia_decaimento=None)
+            self.bulk_update(
+                [
+                    EstatisticaJogador(jogador_id=j, nota_decaida=nota, peso_decaido=peso, dia_decaimento=hoje)
+                    for j, (nota, peso) in estados.items()
+                ],
+                ['nota_decaida', 'peso_decaido', 'dia_decaimento'],
+                batch_size=tamanho_lote,
+            )
+            # O sorteio guardado e os ETags foram calculados com o estado antigo
+            cache.invalidar()
+        return len(estados)
+
+    def medias_robustas(self, modo, percentual=10):
+        """Nota robusta de cada jogador, {jogador_id: valor}, calculada no próprio banco.
+
+        modo: 'aparada' (média sem os percentual% menores e maiores notas),
+        'winsorizada' (essas notas viram a menor/maior nota mantida), 'mediana'
+        ou 'media' (AVG simples, para comparação). Lê as notas brutas da tabela
+        quente e do arquivo, numeradas por jogador com ROW_NUMBER/COUNT OVER
+        (PARTITION BY jogador): só o resultado agregado volta para o Python.
+        """
+        if modo not in _SQL_MEDIAS_ROBUSTAS:
+            raise ValueError(f'Modo de agregação desconhecido: {modo}')
+        percentual = int(percentual)
+        if not 0 <= percentual < 50:
+            raise ValueError('O percentual de corte precisa estar entre 0 e 49')
+        nomes = {
+            'quente': Avaliacao._meta.db_table,
+            'arquivo': AvaliacaoArquivada._meta.db_table,
+            'jogador': Avaliacao._meta.get_field('jogador').column,
+            'nota': Avaliacao._meta.get_field('nota').column,
+        }
+        sql = _SQL_NOTAS_ORDENADAS + _SQL_MEDIAS_ROBUSTAS[modo]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                sql.format(**{chave: connection.ops.quote_name(nome) for chave, nome in nomes.items()}),
+                [percentual],
+            )
+            return {jogador_id: float(valor) for jogador_id, valor in cursor.fetchall()}
+
+    def reconstruir(self):
+        """Recalcula todos os agregados: resumos das rodadas arquivadas mais a tabela quente"""
+        with transaction.atomic(), cache.em_lote():
+            # Uma só invalidação no fim, já somada à do recalcular_decaimento
+            cache.invalidar()
+            self.all().delete()
+            agregados = {}
+            historico = ResumoRodadaJogador.objects.values('jogador_id').annotate(
+                soma=Sum('soma_notas'),
+                total=Sum('total_votos'),
+                quadrados=Sum('soma_quadrados'),
+            ).order_by()
+            quente = Avaliacao.objects.values('jogador_id').annotate(
+                soma=Sum('nota'),
+                total=Count('id'),
+                quadrados=Sum(F('nota') * F('nota')),
+            ).order_by()
+            for linha in [*historico, *quente]:
+                agregado = agregados.setdefault(linha['jogador_id'], EstatisticaJogador(jogador_id=linha['jogador_id']))
+                agregado.soma_notas += linha['soma']
+                agregado.total_votos += linha['total']
+                agregado.soma_quadrados += linha['quadrados']
+            total = len(self.bulk_create(agregados.values()))
+            self.recalcular_decaimento()
+            return total
+
+class EstatisticaJogador(models.Model):
+    """Agregado das notas de um jogador, mantido a cada avaliação gravada"""
+    jogador = models.OneToOneField(Jogador, on_delete=models.CASCADE, primary_key=True, related_name='estatistica')
+    soma_notas = models.BigIntegerField(default=0)
+    total_votos = models.PositiveIntegerField(default=0)
+    soma_quadrados = models.BigIntegerField(default=0)
+    # Média com decaimento exponencial (meia-vida SORTEIO_MEIA_VIDA_DIAS, em dias de
+    # rodada): soma e peso das notas já decaídos até dia_decaimento (date.toordinal())
+    nota_decaida = models.FloatField(default=0)
+    peso_decaido = models.FloatField(default=0)
+    dia_decaimento = models.IntegerField(null=True, blank=True)
+
+    objects = EstatisticaJogadorManager()
+
+    class Meta:
+        verbose_name = 'Estatística do Jogador'
+        verbose_name_plural = 'Estatísticas dos Jogadores'
+
+    def __str__(self):
+        return f"{self.jogador_id}: {self.total_votos} votos"
+
+    @property
+    def media(self):
+        return self.soma_notas / self.total_votos if self.total_votos else 0
+
+    @property
+    def media_recente(self):
+        """Média ponderada pela idade das notas: o peso cai pela metade a cada meia-vida"""
+        return self.nota_decaida / self.peso_decaido if self.total_votos and self.peso_decaido else 0
+
+    @property
+    def variancia(self):
+        if not self.total_votos:
+            return 0
+        return max(self.soma_quadrados / self.total_votos - self.media ** 2, 0)
+
+class EstatisticaDiariaManager(models.Manager):
+    def consolidar(self, ate=None):
+        """Consolida os dias fechados ainda sem resumo, até 'ate' (exclusive; hoje por padrão)"""
+        ate = ate or timezone.localdate()
+        ultimo = self.order_by('-dia').values_list('dia', flat=True).first()
+        avaliacoes = Avaliacao.objects.filter(data_avaliacao__lt=intervalo_do_dia(ate)[0])
+        if ultimo:
+            avaliacoes = avaliacoes.filter(data_avaliacao__gte=intervalo_do_dia(ultimo)[1])
+        linhas = avaliacoes.annotate(dia=TruncDate('data_avaliacao')).values('dia').annotate(
+            votos=Count('id'),
+            votantes=Count('avaliador', distinct=True),
+            jogadores=Count('jogador', distinct=True),
+            soma=Sum('nota'),
+        ).order_by('dia')
+        return self.bulk_create(
+            [
+                EstatisticaDiaria(
+                    dia=linha['dia'],
+                    total_votos=linha['votos'],
+                    votantes_ativos=linha['votantes'],
+                    jogadores_avaliados=linha['jogadores'],
+                    soma_notas=linha['soma'],
+                )
+                for linha in linhas
+            ],
+            ignore_conflicts=True,
+        )
+
+class EstatisticaDiaria(models.Model):
+    """Resumo diário da votação (rollup), para ler o histórico sem varrer Avaliacao"""
+    dia = models.DateField(primary_key=True)
+    total_votos = models.PositiveIntegerField(default=0)
+    votantes_ativos = models.PositiveIntegerField(default=0)
+    jogadores_avaliados = models.PositiveIntegerField(default=0)
+    soma_notas = models.BigIntegerField(default=0)
+
+    objects = EstatisticaDiariaManager()
+
+    class Meta:
+        ordering = ('-dia',)
+        verbose_name = 'Estatística Diária'
+        verbose_name_plural = 'Estatísticas Diárias'
+
+    def __str__(self):
+        return f"{self.dia}: {self.total_votos} votos"
+
+    @property
+    def media_notas(self):
+        return self.soma_notas / self.total_votos if self.total_votos else 0
@@ -0,0 +1,128 @@
+"""Notas corrigidas pelo viés de cada votante, calculadas com NumPy.
+
+Há quem dê nota alta para todo mundo e quem dê nota baixa: a mesma nota 7 não
+quer dizer a mesma coisa vinda de cada um. As notas (da tabela quente e do
+arquivo) são carregadas numa matriz votantes × jogadores esparsa, guardada como
+três vetores (linha, coluna, nota), e todas as contas são feitas de uma vez
+sobre os vetores com np.bincount, sem laço em Python por nota:
+
+- 'zscore': cada nota vira o desvio em relação à média do próprio votante,
+  dividido pelo desvio-padrão dele; a força do jogador é a média desses desvios.
+- 'vies': modelo aditivo nota ≈ média geral + viés do votante + força do
+  jogador, ajustado alternando as duas médias até convergir. Viés e força são
+  puxados para zero quando há poucas notas (regularização).
+
+Nos dois casos o resultado volta para a escala de 0 a 10.
+"""
+from itertools import chain
+
+import numpy as np
+
+from .models import Avaliacao, AvaliacaoArquivada
+
+MODOS = ('zscore', 'vies')
+ITERACOES = 50
+# Notas vão de 0 a 10: mudanças abaixo de um milésimo não alteram o sorteio
+TOLERANCIA = 1e-3
+# Peso do "zero" na média do viés e da força: com poucas notas, ambos encolhem
+REGULARIZACAO = 1.0
+TAMANHO_LOTE = 10000
+
+
+def _indexar(ids):
+    """(ids distintos em ordem, posição de cada id entre eles).
+
+    Mesmo resultado de np.unique(..., return_inverse=True), mas em tempo linear:
+    as chaves primárias são inteiros pequenos e servem de índice direto.
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    if not len(ids):
+        return ids, ids
+    presentes = np.zeros(ids.max() + 1, dtype=bool)
+    presentes[ids] = True
+    posicoes = np.cumsum(presentes) - 1
+    return np.flatnonzero(presentes), posicoes[ids]
+
+
+class MatrizNotas:
+    """Matriz votantes × jogadores esparsa, no formato de coordenadas.
+
+    votantes e jogadores: ids de cada linha e coluna; linha, coluna e nota: um
+    elemento por avaliação. Um votante pode ter várias notas para o mesmo
+    jogador (uma por rodada), e cada uma conta.
+    """
+    def __init__(self, avaliador_ids, jogador_ids, notas):
+        self.votantes, self.linha = _indexar(avaliador_ids)
+        self.jogadores, self.coluna = _indexar(jogador_ids)
+        self.nota = np.asarray(notas, dtype=np.float64)
+
+    @classmethod
+    def do_banco(cls, tamanho_lote=TAMANHO_LOTE):
+        """Todas as notas, da tabela quente e do arquivo"""
+        campos = ('avaliador_id', 'jogador_id', 'nota')
+        linhas = chain(
+            AvaliacaoArquivada.objects.values_list(*campos).iterator(chunk_size=tamanho_lote),
+            Avaliacao.objects.values_list(*campos).iterator(chunk_size=tamanho_lote),
+        )
+        dados = np.fromiter(linhas, dtype=np.dtype((np.int64, 3))).reshape(-1, 3)
+        return cls(dados[:, 0], dados[:, 1], dados[:, 2])
+
+    def __len__(self):
+        return len(self.nota)
+
+    def _por_votante(self, valores):
+        return np.bincount(self.linha, weights=valores, minlength=len(self.votantes))
+
+    def _por_jogador(self, valores):
+        return np.bincount(self.coluna, weights=valores, minlength=len(self.jogadores))
+
+
+def _na_escala(forcas, matriz):
+    """Desvios (em desvios-padrão) de volta para notas de 0 a 10"""
+    return np.clip(matriz.nota.mean() + forcas * matriz.nota.std(), 0, 10)
+
+
+def zscore(matriz):
+    """Força de cada jogador pela média das notas padronizadas por votante"""
+    quantidade = matriz._por_votante(None)
+    media = matriz._por_votante(matriz.nota) / quantidade
+    desvio = matriz.nota - media[matriz.linha]
+    desvio_padrao = np.sqrt(matriz._por_votante(desvio ** 2) / quantidade)
+    # Votante que deu a mesma nota para todos não diz nada sobre a diferença entre eles
+    escala = np.divide(1, desvio_padrao, out=np.zeros_like(desvio_padrao), where=desvio_padrao > 0)
+    padronizada = desvio * escala[matriz.linha]
+    return _na_escala(matriz._por_jogador(padronizada) / matriz._por_jogador(None), matriz)
+
+
+def vies_aditivo(matriz, iteracoes=ITERACOES, tolerancia=TOLERANCIA, regularizacao=REGULARIZACAO):
+    """Força de cada jogador no modelo nota = média + viés do votante + força do jogador.
+
+    Mínimos quadrados alternados: com os vieses fixos, a força é a média
+    (regularizada) do que sobra das notas do jogador, e vice-versa. Para quando
+    nenhum valor muda mais que a tolerância. Devolve (forcas, vieses).
+    """
+    media = matriz.nota.mean()
+    residuo = matriz.nota - media
+    por_votante = matriz._por_votante(None) + regularizacao
+    por_jogador = matriz._por_jogador(None) + regularizacao
+    vies = np.zeros(len(matriz.votantes))
+    forca = np.zeros(len(matriz.jogadores))
+    for _ in range(iteracoes):
+        nova_forca = matriz._por_jogador(residuo - vies[matriz.linha]) / por_jogador
+        vies = matriz._por_votante(residuo - nova_forca[matriz.coluna]) / por_votante
+        convergiu = np.abs(nova_forca - forca).max() < tolerancia
+        forca = nova_forca
+        if convergiu:
+            break
+    return np.clip(media + forca, 0, 10), vies
+
+
+def forcas_normalizadas(modo, matriz=None):
+    """{jogador_id: nota corrigida pelo viés dos votantes} para o modo pedido"""
+    if modo not in MODOS:
+        raise ValueError(f'Modo de normalização desconhecido: {modo!r}')
+    matriz = matriz if matriz is not None else MatrizNotas.do_banco()
+    if not len(matriz):
+        return {}
+    forcas = zscore(matriz) if modo == 'zscore' else vies_aditivo(matriz)[0]
+    return dict(zip(matriz.jogadores.tolist(), forcas.tolist()))
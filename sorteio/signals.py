@@ -0,0 +1,32 @@
+from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from . import cache
+from .backends import guardar_snapshot, invalidar_snapshot
+from .models import Avaliacao, EstatisticaJogador, Jogador, RestricaoPar, Votante
+
+@receiver(post_delete, sender=Avaliacao)
+def avaliacao_removida(sender, instance, **kwargs):
+    """Retira a nota removida do agregado do jogador (roda dentro da transação do delete)"""
+    EstatisticaJogador.objects.remover_nota(instance.jogador_id, instance.nota, instance.rodada_id)
+
+@receiver(post_save, sender=Avaliacao)
+@receiver(post_delete, sender=Avaliacao)
+@receiver(post_save, sender=Jogador)
+@receiver(post_delete, sender=Jogador)
+@receiver(post_save, sender=RestricaoPar)
+@receiver(post_delete, sender=RestricaoPar)
+def notas_alteradas(sender, **kwargs):
+    """Invalida o sorteio em cache quando uma nota, um jogador ou uma restrição muda"""
+    cache.invalidar()
+
+@receiver(post_save, sender=Votante)
+@receiver(post_delete, sender=Votante)
+def votante_alterado(sender, instance, **kwargs):
+    """Descarta o snapshot em cache do votante alterado"""
+    invalidar_snapshot(instance.pk)
+
+@receiver(user_logged_in)
+def votante_logado(sender, user, **kwargs):
+    """Já deixa o snapshot pronto para a primeira requisição após o login"""
+    guardar_snapshot(user)
@@ -1,3 +1,1020 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache as django_cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, connection, transaction
+from django.db.models import QuerySet
+from django.templatetags.static import static
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from . import backends, balanceamento, cache, eventos, normalizacao, views
+from .balanceamento import (
+    Restricoes, alternativas, avaliar, balancear, balancear_com_restricoes, exato, guloso, serpentina,
+)
+from .models import (
+    Avaliacao, AvaliacaoArquivada, EstatisticaDiaria, EstatisticaJogador, Jogador, RestricaoPar, ResumoRodadaJogador,
+    Rodada, Votante, intervalo_do_dia,
+)
+from .views import distribuir_times_equilibrados
+
+
+# Cache visto por todos os processos, como o 'db' ou o 'file' em produção
+CACHE_COMPARTILHADO = {
+    **settings.CACHES,
+    'compartilhado': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(tempfile.gettempdir(), 'sorteio-testes-cache'),
+    },
+}
+
+
+@override_settings(CACHES=CACHE_COMPARTILHADO, SORTEIO_CACHE_ALIAS='compartilhado')
+class VotarTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.votante = Votante.objects.create_user('votante', password='senha-forte-123', nome_completo='Votante')
+        cls.jogadores = [Jogador.objects.create(nome=f'Jogador {i:02d}') for i in range(24)]
+        for jogador in cls.jogadores[:5]:
+            Avaliacao.objects.create(avaliador=cls.votante, jogador=jogador, nota=7)
+
+    def setUp(self):
+        caches['compartilhado'].clear()
+        self.client.force_login(self.votante)
+
+    def test_get_usa_consulta_unica_de_progresso(self):
+        # sessão + progresso (o usuário vem do snapshot em cache)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('votar'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['jogador'], self.jogadores[5])
+        self.assertEqual(response.context['avaliacoes_feitas'], 5)
+        self.assertEqual(response.context['jogadores_restantes'], 19)
+        self.assertEqual(response.context['total_jogadores'], 24)
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_get_com_sessao_em_cookie_faz_so_a_consulta_de_progresso(self):
+        self.client.force_login(self.votante)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('votar'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_snapshot_do_usuario_e_invalidado_ao_salvar(self):
+        self.client.get(reverse('votar'))
+        self.votante.is_superuser = True
+        self.votante.save()
+        response = self.client.get(reverse('votar'))
+        self.assertRedirects(response, reverse('admin_dashboard'), fetch_redirect_response=False)
+
+    def test_senha_trocada_ou_desativado_derruba_a_sessao_em_todos_os_workers(self):
+        self.client.get(reverse('votar'))
+        self.assertIsNotNone(caches['compartilhado'].get(backends._chave(self.votante.pk)))
+        # Outro worker troca a senha: o snapshot some do cache de todos
+        self.votante.set_password('outra-senha-forte-456')
+        self.votante.save()
+        self.assertRedirects(self.client.get(reverse('votar')), f"{reverse('login')}?next={reverse('votar')}",
+                             fetch_redirect_response=False)
+
+        self.client.force_login(self.votante)
+        self.client.get(reverse('votar'))
+        self.votante.is_active = False
+        self.votante.save()
+        self.assertIsNone(backends.VotanteCacheBackend().get_user(self.votante.pk))
+
+    @override_settings(CACHES=settings.CACHES, SORTEIO_CACHE_ALIAS='default')
+    def test_cache_local_nao_guarda_snapshot(self):
+        # Snapshot velho deixado no cache local deste processo por outro caminho
+        backends._cache().set(backends._chave(self.votante.pk), {'id': self.votante.pk, 'is_active': True})
+        Votante.objects.filter(pk=self.votante.pk).update(is_active=False)
+        self.assertIsNone(backends.VotanteCacheBackend().get_user(self.votante.pk))
+        self.client.force_login(Votante.objects.create_user('outro', password='senha-forte-123'))
+        self.assertIsNone(backends._cache().get(backends._chave(Votante.objects.get(username='outro').pk)))
+
+    def test_post_registra_nota_do_jogador_do_formulario(self):
+        response = self.client.post(reverse('votar'), {'nota': 9, 'jogador': self.jogadores[5].pk})
+        self.assertRedirects(response, reverse('votar'), fetch_redirect_response=False)
+        self.assertEqual(Avaliacao.objects.get(avaliador=self.votante, jogador=self.jogadores[5]).nota, 9)
+
+    def test_post_repetido_regrava_a_mesma_nota(self):
+        for _ in range(2):
+            response = self.client.post(reverse('votar'), {'nota': 9, 'jogador': self.jogadores[5].pk})
+            self.assertEqual(response.status_code, 302)
+        self.assertEqual(Avaliacao.objects.filter(avaliador=self.votante).count(), 6)
+        self.assertEqual(Jogador.objects.get(pk=self.jogadores[5].pk).total_votos, 1)
+        self.assertEqual(Jogador.objects.get(pk=self.jogadores[6].pk).total_votos, 0)
+
+    def test_redireciona_para_parcial_quando_concluido(self):
+        for jogador in self.jogadores[5:]:
+            Avaliacao.objects.create(avaliador=self.votante, jogador=jogador, nota=5)
+        response = self.client.get(reverse('votar'))
+        self.assertRedirects(response, reverse('parcial_times'), fetch_redirect_response=False)
+
+
+class VotarTodosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.votante = Votante.objects.create_user('votante', password='senha-forte-123', nome_completo='Votante')
+        cls.jogadores = [Jogador.objects.create(nome=f'Jogador {i:02d}') for i in range(6)]
+        Avaliacao.objects.create(avaliador=cls.votante, jogador=cls.jogadores[0], nota=4)
+
+    def setUp(self):
+        self.client.force_login(self.votante)
+
+    def _dados(self, jogadores, nota=8):
+        dados = {'form-TOTAL_FORMS': len(jogadores), 'form-INITIAL_FORMS': len(jogadores)}
+        for i, jogador in enumerate(jogadores):
+            dados[f'form-{i}-jogador'] = jogador.pk
+            dados[f'form-{i}-nota'] = nota
+        return dados
+
+    def test_get_lista_apenas_jogadores_restantes(self):
+        response = self.client.get(reverse('votar_todos'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [form.jogador_avaliado for form in response.context['formset']],
+            self.jogadores[1:],
+        )
+
+    def test_post_grava_todas_as_notas_e_agregados(self):
+        response = self.client.post(reverse('votar_todos'), self._dados(self.jogadores[1:]))
+        self.assertRedirects(response, reverse('parcial_times'), fetch_redirect_response=False)
+        self.assertEqual(Avaliacao.objects.filter(avaliador=self.votante).count(), 6)
+        self.assertEqual(Jogador.objects.get(pk=self.jogadores[3].pk).media_avaliacoes, 8)
+        self.assertEqual(Jogador.objects.get(pk=self.jogadores[0].pk).total_votos, 1)
+
+    def test_post_rejeita_jogador_ja_avaliado(self):
+        response = self.client.post(reverse('votar_todos'), self._dados(self.jogadores))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['formset'].non_form_errors())
+        self.assertEqual(Avaliacao.objects.filter(avaliador=self.votante).count(), 1)
+
+
+@override_settings(TIME_ZONE='America/Sao_Paulo')
+class IntervaloDoDiaTests(TestCase):
+    def test_fronteira_do_dia_no_fuso_local(self):
+        dia = date(2025, 3, 10)
+        inicio, fim = intervalo_do_dia(dia)
+        # Meia-noite em São Paulo (UTC-3) são 3h em UTC
+        self.assertEqual(inicio, datetime(2025, 3, 10, 3, tzinfo=dt_timezone.utc))
+        self.assertEqual(fim, datetime(2025, 3, 11, 3, tzinfo=dt_timezone.utc))
+
+        votante = Votante.objects.create_user('votante', password='senha-forte-123')
+        ultimo_segundo, meia_noite = Jogador.objects.create(nome='23:59:59'), Jogador.objects.create(nome='00:00')
+        Avaliacao.objects.registrar_notas(votante, {ultimo_segundo.pk: 5, meia_noite.pk: 5})
+        fuso = timezone.get_current_timezone()
+        Avaliacao.objects.filter(jogador=ultimo_segundo).update(
+            data_avaliacao=datetime(2025, 3, 10, 23, 59, 59, tzinfo=fuso)
+        )
+        Avaliacao.objects.filter(jogador=meia_noite).update(data_avaliacao=datetime(2025, 3, 11, tzinfo=fuso))
+
+        for d, esperado in ((dia, '23:59:59'), (dia + timedelta(days=1), '00:00')):
+            do_dia = Avaliacao.objects.do_dia(intervalo_do_dia(d))
+            self.assertEqual(list(do_dia.values_list('jogador__nome', flat=True)), [esperado])
+            # Mesmo resultado do filtro por data local que a faixa substituiu
+            self.assertQuerySetEqual(do_dia, Avaliacao.objects.filter(data_avaliacao__date=d), ordered=False)
+
+
+class RegistrarNotasConcorrenciaTests(TransactionTestCase):
+    def test_envios_paralelos_nao_duplicam_nem_quebram_agregados(self):
+        votantes = [
+            Votante.objects.create_user(f'votante{i}', password='senha-forte-123', nome_completo=f'Votante {i}')
+            for i in range(4)
+        ]
+        jogadores = [Jogador.objects.create(nome=f'Jogador {i}') for i in range(3)]
+        erros = []
+        barreira = threading.Barrier(16)
+
+        def enviar(votante, nota):
+            try:
+                barreira.wait()
+                Avaliacao.objects.registrar_notas(votante, {j.pk: nota for j in jogadores})
+            except Exception as erro:
+                erros.append(erro)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=enviar, args=(votante, nota))
+            for votante in votantes
+            for nota in (5, 5, 5, 5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(erros, [])
+        self.assertEqual(Avaliacao.objects.count(), 12)
+        for jogador in jogadores:
+            self.assertEqual(jogador.estatistica.total_votos, 4)
+            self.assertEqual(jogador.estatistica.soma_notas, 20)
+            self.assertEqual(jogador.estatistica.soma_quadrados, 100)
+
+
+class CacheNotasTests(TransactionTestCase):
+    def setUp(self):
+        django_cache.clear()
+
+    def test_falhas_simultaneas_calculam_uma_vez(self):
+        chamadas = []
+        barreira = threading.Barrier(8)
+        resultados = []
+
+        def calcular():
+            chamadas.append(1)
+            time.sleep(0.2)
+            return 'times'
+
+        def pedir():
+            barreira.wait()
+            resultados.append(cache.obter('times', calcular))
+
+        threads = [threading.Thread(target=pedir) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(chamadas), 1)
+        self.assertEqual(resultados, ['times'] * 8)
+
+    def test_so_escrita_confirmada_muda_a_chave(self):
+        contador = iter(range(100))
+
+        def calcular():
+            return next(contador)
+
+        self.assertEqual(cache.obter('times', calcular), 0)
+        with self.assertRaises(DatabaseError):
+            with transaction.atomic():
+                Jogador.objects.create(nome='Desfeito')
+                raise DatabaseError
+        self.assertEqual(cache.obter('times', calcular), 0)
+
+        with transaction.atomic():
+            Jogador.objects.create(nome='Confirmado')
+            # Antes do commit a versão ainda é a antiga
+            self.assertEqual(cache.obter('times', calcular), 0)
+        self.assertEqual(cache.obter('times', calcular), 1)
+
+    @override_settings(CACHES=CACHE_COMPARTILHADO, SORTEIO_CACHE_ALIAS='compartilhado')
+    def test_escritas_simultaneas_nunca_repetem_a_versao(self):
+        caches['compartilhado'].clear()
+        vistas = [cache.versao_notas()]
+        barreira = threading.Barrier(8)
+
+        def escrever():
+            barreira.wait()
+            cache._incrementar_versao()
+            vistas.append(cache.versao_notas())
+
+        # Cada thread tem a própria instância do backend: o incr é trocado na classe
+        incr = mock.patch.object(type(caches['compartilhado']), 'incr', side_effect=AssertionError('incr'))
+        with incr:
+            threads = [threading.Thread(target=escrever) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(len(vistas), 9)
+        self.assertNotIn(vistas[0], vistas[1:])
+
+
+@override_settings(MEDICAO_REQUISICOES=True, CACHES=CACHE_COMPARTILHADO, SORTEIO_CACHE_ALIAS='compartilhado')
+class MedicaoRequisicaoTests(TestCase):
+    def test_cabecalhos_de_medicao(self):
+        caches['compartilhado'].clear()
+        votante = Votante.objects.create_user('votante', password='senha-forte-123', nome_completo='Votante')
+        Jogador.objects.create(nome='Jogador')
+        self.client.force_login(votante)
+        with self.assertLogs('sorteio.medicao', level='INFO') as logs:
+            response = self.client.get(reverse('votar'))
+        self.assertEqual(response['X-Query-Count'], '2')
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('tpl;dur=', response['Server-Timing'])
+        self.assertIn('"url_name": "votar"', logs.output[0])
+
+
+@override_settings(CACHES=CACHE_COMPARTILHADO, SORTEIO_CACHE_ALIAS='compartilhado')
+class RespostaCondicionalTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.votante = Votante.objects.create_user('votante', password='senha-forte-123', nome_completo='Votante')
+        cls.jogadores = [Jogador.objects.create(nome=f'Jogador {i}') for i in range(4)]
+        Avaliacao.objects.registrar_notas(cls.votante, {j.pk: 6 for j in cls.jogadores})
+
+    def setUp(self):
+        caches['compartilhado'].clear()
+        self.client.force_login(self.votante)
+
+    def test_parcial_sem_mudanca_responde_304_so_com_a_sessao(self):
+        response = self.client.get(reverse('parcial_times'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response['Cache-Control'])
+        etag = response['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('parcial_times'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Avaliacao.objects.registrar_notas(self.votante, {self.jogadores[0].pk: 9})
+        response = self.client.get(reverse('parcial_times'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_do_parcial_nao_vale_para_outro_votante(self):
+        etag = self.client.get(reverse('parcial_times'))['ETag']
+        outro = Votante.objects.create_user('outro', password='senha-forte-123', nome_completo='Outro')
+        self.client.force_login(outro)
+        response = self.client.get(reverse('parcial_times'), HTTP_IF_NONE_MATCH=etag)
+        self.assertRedirects(response, reverse('votar'))
+
+    def test_paginas_do_admin_respondem_304(self):
+        self.client.force_login(Votante.objects.create_superuser('admin', password='senha-forte-123'))
+        for nome in ('sortear_times', 'listar_jogadores'):
+            etag = self.client.get(reverse(nome))['ETag']
+            self.assertEqual(self.client.get(reverse(nome), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_redirecionamentos_nao_respondem_304(self):
+        condicional = {'HTTP_IF_NONE_MATCH': '*', 'HTTP_IF_MODIFIED_SINCE': 'Fri, 01 Jan 2100 00:00:00 GMT'}
+        Jogador.objects.create(nome='Ainda sem voto')
+        casos = [(self.votante, 'parcial_times'), (self.votante, 'sortear_times'), (None, 'parcial_times')]
+        for usuario, nome in casos:
+            if usuario is None:
+                self.client.logout()
+            response = self.client.get(reverse(nome), **condicional)
+            self.assertEqual(response.status_code, 302)
+            self.assertNotIn('ETag', response)
+            self.assertNotIn('Last-Modified', response)
+
+
+@override_settings(CACHES=CACHE_COMPARTILHADO, SORTEIO_CACHE_ALIAS='compartilhado')
+class AdminDashboardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Votante.objects.create_superuser('admin', password='senha-forte-123', nome_completo='Admin')
+        votantes = [
+            Votante.objects.create_user(f'votante{i}', password='senha-forte-123', nome_completo=f'Votante {i}')
+            for i in range(3)
+        ]
+        jogadores = [Jogador.objects.create(nome=f'Jogador {i}') for i in range(4)]
+        Jogador.objects.create(nome='Inativo', ativo=False)
+        for votante in votantes[:2]:
+            Avaliacao.objects.registrar_notas(votante, {j.pk: 6 for j in jogadores})
+        # Avaliações de um dia anterior
+        ontem = timezone.now() - timedelta(days=1)
+        Avaliacao.objects.registrar_notas(votantes[2], {jogadores[0].pk: 8, jogadores[1].pk: 4})
+        Avaliacao.objects.filter(avaliador=votantes[2]).update(data_avaliacao=ontem)
+
+    def setUp(self):
+        # A consolidação roda no primeiro acesso do dia, marcado no cache
+        caches['compartilhado'].clear()
+
+    def test_numeros_ao_vivo_e_historico(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('admin_dashboard'))
+        self.assertEqual(response.context['total_jogadores'], 4)
+        self.assertEqual(response.context['total_votantes'], 3)
+        self.assertEqual(response.context['total_votos'], 10)
+        self.assertEqual(response.context['votos_hoje'], 8)
+        self.assertEqual(response.context['votantes_ativos_hoje'], 2)
+        ontem = EstatisticaDiaria.objects.get()
+        self.assertEqual((ontem.total_votos, ontem.votantes_ativos, ontem.media_notas), (2, 1, 6))
+
+    def test_numeros_ao_vivo_em_uma_consulta(self):
+        self.client.force_login(self.admin)
+        self.client.get(reverse('admin_dashboard'))
+        # Dia já consolidado: sessão + números ao vivo + histórico
+        with self.assertNumQueries(3):
+            self.client.get(reverse('admin_dashboard'))
+
+    def test_falha_na_consolidacao_nao_marca_o_dia(self):
+        self.client.force_login(self.admin)
+        with mock.patch.object(EstatisticaDiaria.objects, 'consolidar', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.client.get(reverse('admin_dashboard'))
+        self.client.get(reverse('admin_dashboard'))
+        self.assertTrue(EstatisticaDiaria.objects.exists())
+        # O dashboard não arquiva: as rodadas ficam para o comando arquivar_rodadas
+        self.assertFalse(AvaliacaoArquivada.objects.exists())
+
+
+class ArquivarRodadasTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.ontem = timezone.localdate() - timedelta(days=1)
+        votantes = [
+            Votante.objects.create_user(f'votante{i}', password='senha-forte-123', nome_completo=f'Votante {i}')
+            for i in range(2)
+        ]
+        cls.jogadores = [Jogador.objects.create(nome=f'Jogador {i}') for i in range(2)]
+        for i, votante in enumerate(votantes):
+            Avaliacao.objects.registrar_notas(votante, {j.pk: 4 + 2 * i for j in cls.jogadores})
+        # As notas acima passam a ser da rodada de ontem; a de hoje continua na tabela quente
+        Rodada.objects.garantir(cls.ontem)
+        Avaliacao.objects.update(rodada_id=cls.ontem, data_avaliacao=timezone.now() - timedelta(days=1))
+        Avaliacao.objects.registrar_notas(votantes[0], {cls.jogadores[0].pk: 10})
+
+    def _medias(self):
+        return dict(Jogador.objects.com_medias().values_list('pk', 'media_notas'))
+
+    def test_move_rodadas_fechadas_para_o_arquivo_e_resumo(self):
+        medias = self._medias()
+        call_command('arquivar_rodadas', stdout=StringIO())
+
+        self.assertEqual(list(Avaliacao.objects.values_list('rodada_id', 'nota')), [(timezone.localdate(), 10)])
+        self.assertEqual(AvaliacaoArquivada.objects.filter(rodada_id=self.ontem).count(), 4)
+        self.assertTrue(Rodada.objects.get(dia=self.ontem).arquivada)
+        resumo = ResumoRodadaJogador.objects.get(rodada_id=self.ontem, jogador=self.jogadores[0])
+        self.assertEqual(
+            (resumo.total_votos, resumo.soma_notas, resumo.nota_minima, resumo.nota_maxima), (2, 10, 4, 6)
+        )
+        self.assertEqual(EstatisticaDiaria.objects.get(dia=self.ontem).total_votos, 4)
+
+        # Médias e totais históricos continuam os mesmos, agora lidos dos resumos
+        self.assertEqual(Avaliacao.objects.numeros_do_painel()['total_votos'], 5)
+        self.assertEqual(self._medias(), medias)
+        versao = cache.versao_notas()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            EstatisticaJogador.objects.reconstruir()
+        self.assertEqual(self._medias(), medias)
+        self.assertNotEqual(cache.versao_notas(), versao)
+        self.assertEqual(len(callbacks), 2)
+        self.assertAlmostEqual(medias[self.jogadores[0].pk], 20 / 3)
+
+
+class MediaRecenteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.votante = Votante.objects.create_user('votante', password='senha-forte-123', nome_completo='Votante')
+        cls.antigo, cls.recente = Jogador.objects.create(nome='Antigo'), Jogador.objects.create(nome='Recente')
+        # Uma meia-vida atrás: o antigo jogava bem e o recente mal; hoje o contrário
+        dia_antigo = Rodada.objects.garantir(timezone.localdate() - timedelta(days=90))
+        for jogador, nota in ((cls.antigo, 10), (cls.recente, 4)):
+            Avaliacao.objects.create(avaliador=cls.votante, jogador=jogador, nota=nota, rodada_id=dia_antigo)
+        Avaliacao.objects.registrar_notas(cls.votante, {cls.antigo.pk: 4, cls.recente.pk: 10})
+
+    def _medias(self):
+        return {
+            j.pk: (j.media_notas, j.media_recente)
+            for j in Jogador.objects.com_medias()
+        }
+
+    @override_settings(SORTEIO_MEIA_VIDA_DIAS=90)
+    def test_notas_recentes_pesam_mais_e_estado_incremental_confere(self):
+        medias = self._medias()
+        self.assertAlmostEqual(medias[self.antigo.pk][0], medias[self.recente.pk][0])
+        self.assertAlmostEqual(medias[self.antigo.pk][1], (10 * 0.5 + 4) / 1.5)
+        self.assertAlmostEqual(medias[self.recente.pk][1], (4 * 0.5 + 10) / 1.5)
+
+        # Regravar a nota de hoje troca a nota dentro do estado decaído, sem somar peso
+        Avaliacao.objects.registrar_notas(self.votante, {self.antigo.pk: 6})
+        self.assertAlmostEqual(self._medias()[self.antigo.pk][1], (10 * 0.5 + 6) / 1.5)
+
+        incremental = self._medias()
+        versao = cache.versao_notas()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('recalcular_decaimento', stdout=StringIO())
+        self.assertNotEqual(cache.versao_notas(), versao)
+        for pk, (media, recente) in self._medias().items():
+            self.assertAlmostEqual(media, incremental[pk][0])
+            self.assertAlmostEqual(recente, incremental[pk][1])
+
+        # Removida a nota antiga, sobra só a de hoje
+        Avaliacao.objects.get(jogador=self.antigo, rodada__dia__lt=timezone.localdate()).delete()
+        self.assertAlmostEqual(self._medias()[self.antigo.pk][1], 6)
+
+    def test_sorteio_pela_media_recente(self):
+        times = distribuir_times_equilibrados(num_times=2, criterio='recente')
+        notas = {j.pk: j.nota_sorteio for time in times for j in time}
+        self.assertAlmostEqual(notas[self.recente.pk], 8)
+        self.assertAlmostEqual(notas[self.antigo.pk], 6)
+
+
+class MediasRobustasTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.craque, cls.perna = Jogador.objects.create(nome='Craque'), Jogador.objects.create(nome='Perna')
+        votantes = [Votante.objects.create_user(f'votante{i}', password='senha-forte-123') for i in range(10)]
+        # Metade das notas numa rodada passada (vai para o arquivo); o último votante é o troll
+        ontem = Rodada.objects.garantir(timezone.localdate() - timedelta(days=1))
+        for votante, nota in zip(votantes[:5], (8, 8, 9, 9, 7)):
+            Avaliacao.objects.create(avaliador=votante, jogador=cls.craque, nota=nota, rodada_id=ontem)
+        for votante, nota in zip(votantes[5:], (8, 9, 8, 9, 0)):
+            Avaliacao.objects.registrar_notas(votante, {cls.craque.pk: nota, cls.perna.pk: 10 if nota == 0 else 4})
+        Rodada.objects.arquivar()
+
+    def test_voto_extremo_pesa_menos_que_na_media(self):
+        self.assertTrue(AvaliacaoArquivada.objects.filter(jogador=self.craque).exists())
+        medias = {modo: EstatisticaJogador.objects.medias_robustas(modo, 10) for modo in ('media', 'aparada', 'mediana', 'winsorizada')}
+        # Craque: 0 7 8 8 8 8 9 9 9 9; Perna: 4 4 4 4 10
+        self.assertAlmostEqual(medias['media'][self.craque.pk], 7.5)
+        self.assertAlmostEqual(medias['aparada'][self.craque.pk], 66 / 8)
+        self.assertAlmostEqual(medias['winsorizada'][self.craque.pk], (7 + 7 + 8 * 4 + 9 * 4) / 10)
+        self.assertAlmostEqual(medias['mediana'][self.craque.pk], 8)
+        self.assertAlmostEqual(medias['mediana'][self.perna.pk], 4)
+        # Com 5 notas, 10% não corta nenhuma inteira; 20% corta uma de cada ponta
+        self.assertAlmostEqual(medias['aparada'][self.perna.pk], 5.2)
+        self.assertAlmostEqual(EstatisticaJogador.objects.medias_robustas('aparada', 20)[self.perna.pk], 4)
+        self.assertAlmostEqual(medias['media'][self.craque.pk], Jogador.objects.com_medias().get(pk=self.craque.pk).media_notas)
+
+        with self.assertRaises(ValueError):
+            EstatisticaJogador.objects.medias_robustas('moda')
+        with self.assertRaises(ValueError):
+            EstatisticaJogador.objects.medias_robustas('aparada', 50)
+
+    @override_settings(SORTEIO_PERCENTUAL_CORTE=20)
+    def test_sorteio_pela_mediana(self):
+        Jogador.objects.create(nome='Sem Notas')
+        times = distribuir_times_equilibrados(num_times=2, criterio='mediana')
+        notas = {j.nome: j.nota_sorteio for time in times for j in time}
+        self.assertEqual(notas, {'Craque': 8, 'Perna': 4, 'Sem Notas': 0})
+
+
+class NormalizacaoVotantesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.jogadores = [Jogador.objects.create(nome=f'Jogador {i}') for i in range(4)]
+        # Todos concordam na ordem; o bonzinho soma 3 em tudo e o carrasco tira 3
+        cls.forcas = (4, 5, 6, 7)
+        votantes = {
+            vies: [Votante.objects.create_user(f'votante{vies}_{i}', password='senha-forte-123') for i in range(2)]
+            for vies in (-3, 0, 3)
+        }
+        ontem = Rodada.objects.garantir(timezone.localdate() - timedelta(days=1))
+        for vies, grupo in votantes.items():
+            for votante in grupo:
+                for jogador, forca in zip(cls.jogadores, cls.forcas):
+                    Avaliacao.objects.create(avaliador=votante, jogador=jogador, nota=forca + vies, rodada_id=ontem)
+        Rodada.objects.arquivar()
+        # Hoje só o bonzinho avaliou, e só os dois piores: na média simples eles se aproximam dos outros
+        for votante in votantes[3]:
+            Avaliacao.objects.registrar_notas(votante, {cls.jogadores[0].pk: 7, cls.jogadores[1].pk: 8})
+
+    def test_forcas_descontam_o_vies_do_votante(self):
+        medias = {j.pk: j.media_notas for j in Jogador.objects.com_medias()}
+        self.assertLess(medias[self.jogadores[2].pk] - medias[self.jogadores[1].pk], 0.5)
+
+        matriz = normalizacao.MatrizNotas.do_banco()
+        self.assertEqual(len(matriz), 6 * 4 + 2 * 2)
+        forcas, vieses = normalizacao.vies_aditivo(matriz, regularizacao=0, tolerancia=1e-9, iteracoes=500)
+        # Sem regularização o modelo aditivo recupera as forças (a menos de uma constante)
+        self.assertTrue(np.allclose(np.diff(forcas), 1, atol=1e-3))
+        self.assertTrue(np.allclose(vieses[[0, 2, 4]] - vieses[[1, 3, 5]], 0, atol=1e-3))
+        self.assertAlmostEqual(vieses[4] - vieses[0], 6, places=3)
+
+        for modo in normalizacao.MODOS:
+            notas = normalizacao.forcas_normalizadas(modo)
+            ordem = sorted(notas, key=notas.get)
+            self.assertEqual(ordem, [j.pk for j in self.jogadores])
+        with self.assertRaises(ValueError):
+            normalizacao.forcas_normalizadas('media')
+
+    def test_sorteio_pelo_vies_e_banco_sem_notas(self):
+        times = distribuir_times_equilibrados(num_times=2, criterio='vies')
+        notas = {j.pk: j.nota_sorteio for time in times for j in time}
+        self.assertEqual(sorted(notas, key=notas.get), [j.pk for j in self.jogadores])
+
+        Avaliacao.objects.all().delete()
+        AvaliacaoArquivada.objects.all().delete()
+        self.assertEqual(normalizacao.forcas_normalizadas('zscore'), {})
+
+
+class BalanceamentoTests(SimpleTestCase):
+    NOTAS = [9.5, 9.0, 8.0, 7.5, 7.0, 6.5, 6.0, 6.0, 5.5, 5.0, 4.0, 3.0]
+
+    def _confere_divisao(self, times, total, num_times):
+        self.assertEqual(len(times), num_times)
+        self.assertEqual(sorted(i for time in times for i in time), list(range(total)))
+        tamanhos = [len(time) for time in times]
+        self.assertLessEqual(max(tamanhos) - min(tamanhos), 1)
+
+    def test_serpentina_vai_e_volta(self):
+        times = serpentina(self.NOTAS, 4)
+        self.assertEqual(times, [[0, 7, 8], [1, 6, 9], [2, 5, 10], [3, 4, 11]])
+
+    def test_guloso_e_exato_equilibram(self):
+        for estrategia in ('serpentina', 'guloso', 'exato'):
+            self._confere_divisao(balancear(self.NOTAS, 4, estrategia), len(self.NOTAS), 4)
+        spread_serpentina = avaliar(self.NOTAS, serpentina(self.NOTAS, 4))[0]
+        spread_guloso = avaliar(self.NOTAS, guloso(self.NOTAS, 4))[0]
+        spread_exato = avaliar(self.NOTAS, exato(self.NOTAS, 4))[0]
+        self.assertLessEqual(spread_exato, spread_guloso)
+        self.assertLessEqual(spread_guloso, spread_serpentina)
+        # Divisão perfeita existe (10+6+3, 9+6+4, 8+6+5, 7+7+5) e o exato a encontra
+        notas = [10, 9, 8, 7, 7, 6, 6, 6, 5, 5, 4, 3]
+        self.assertAlmostEqual(avaliar(notas, exato(notas, 4))[0], 0)
+
+    def test_exato_para_no_limite_de_nos_e_nao_depende_do_relogio(self):
+        notas = [round(3 + (i * 37 % 64) / 10, 1) for i in range(24)]
+        times = exato(notas, 4)
+        self.assertEqual(exato(notas, 4, tempo_limite=None), times)
+        self.assertLessEqual(avaliar(notas, times)[0], avaliar(notas, guloso(notas, 4))[0])
+        # Sem nós para explorar, fica com a divisão gulosa
+        self.assertEqual(exato(notas, 4, limite_nos=0), guloso(notas, 4))
+
+    def test_menos_jogadores_que_times(self):
+        for estrategia in ('serpentina', 'guloso', 'exato'):
+            times = balancear([5, 4, 3], 4, estrategia)
+            self._confere_divisao(times, 3, 4)
+            self.assertEqual(sorted(len(time) for time in times), [0, 1, 1, 1])
+        self.assertEqual(balancear([], 4, 'exato'), [[], [], [], []])
+        with self.assertRaises(ValueError):
+            balancear(self.NOTAS, 4, 'aleatorio')
+
+
+class OpcoesSorteioTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Votante.objects.create_superuser('admin', password='senha-forte-123', nome_completo='Admin')
+        votante = Votante.objects.create_user('votante', password='senha-forte-123', nome_completo='Votante')
+        jogadores = [Jogador.objects.create(nome=f'Jogador {i:02d}') for i in range(16)]
+        Avaliacao.objects.registrar_notas(votante, {j.pk: (3 * i) % 11 for i, j in enumerate(jogadores)})
+        cls.notas = [(3 * i) % 11 + 0.5 * (i % 3) for i in range(16)]
+
+    def test_mesma_semente_mesmas_opcoes_com_ou_sem_pool(self):
+        opcoes = alternativas(self.notas, 4, k=3, tentativas=16, semente=5, processos=0)
+        self.assertTrue(opcoes.completas)
+        self.assertEqual(len({tuple(map(tuple, times)) for _, times in opcoes}), 3)
+        self.assertEqual([d for d, _ in opcoes], sorted(d for d, _ in opcoes))
+        self.assertLessEqual(opcoes[0][0], avaliar(self.notas, guloso(self.notas, 4))[0])
+        self.assertEqual(alternativas(self.notas, 4, k=3, tentativas=16, semente=5, processos=2), opcoes)
+        # O pool do módulo é reaproveitado entre chamadas
+        pool = balanceamento._pool
+        self.assertEqual(alternativas(self.notas, 4, k=3, tentativas=16, semente=5, processos=2), opcoes)
+        self.assertIs(balanceamento._pool, pool)
+        # Processos novos, sem herdar conexões e threads do worker do Django
+        self.assertEqual(pool._mp_context.get_start_method(), 'spawn')
+
+    def test_respeita_o_prazo(self):
+        notas = [i % 97 / 7 for i in range(3000)]
+        inicio = time.perf_counter()
+        with self.assertLogs('sorteio.balanceamento', level='WARNING'):
+            opcoes = alternativas(notas, 4, k=2, tentativas=50, semente=1, tempo_limite=0.3, processos=0)
+        self.assertLess(time.perf_counter() - inicio, 1.5)
+        self.assertTrue(opcoes)
+        self.assertFalse(opcoes.completas)
+
+    @override_settings(SORTEIO_OPCOES_PROCESSOS=0)
+    def test_pagina_mostra_opcoes_lado_a_lado(self):
+        self.client.force_login(self.admin)
+        padrao = self.client.get(reverse('sortear_times'))
+        response = self.client.get(reverse('sortear_times'), {'opcoes': 3, 'semente': 2})
+        self.assertEqual(len(response.context['opcoes']), 3)
+        self.assertContains(response, 'Opção 3')
+        for letra in 'ABCD':
+            self.assertContains(response, f'Time {letra} ', count=3)
+        self.assertNotEqual(response['ETag'], padrao['ETag'])
+        # Mesma semente, mesmas opções (vindas do cache ou recalculadas)
+        django_cache.clear()
+        de_novo = self.client.get(reverse('sortear_times'), {'opcoes': 3, 'semente': 2})
+        self.assertEqual(
+            [[[j.pk for j in time] for time in times] for _, times in de_novo.context['opcoes']],
+            [[[j.pk for j in time] for time in times] for _, times in response.context['opcoes']],
+        )
+
+
+class SorteioComRestricoesTests(TestCase):
+    def setUp(self):
+        django_cache.clear()
+
+    def _cumpre(self, times, restricoes):
+        time_de = {i: t for t, time in enumerate(times) for i in time}
+        return (
+            all(time_de[a] != time_de[b] for a, b in restricoes.separar)
+            and all(time_de[a] == time_de[b] for a, b in restricoes.juntar)
+        )
+
+    def test_goleiros_posicoes_e_pares_em_elenco_grande(self):
+        for total in (24, 200):
+            notas = [(7 * i) % 10 + (i % 3) / 3 for i in range(total)]
+            posicoes = ['goleiro'] * 4 + [('defensor', 'meio', 'atacante', '')[i % 4] for i in range(total - 4)]
+            restricoes = Restricoes(posicoes, separar=[(4, 8), (8, 12), (4, 12)], juntar=[(5, 9)])
+            inicio = time.perf_counter()
+            times, relaxadas, nao_verificadas = balancear_com_restricoes(notas, 4, restricoes)
+            self.assertLess(time.perf_counter() - inicio, 1.0)
+            self.assertEqual((relaxadas, nao_verificadas), ([], []))
+            self.assertTrue(self._cumpre(times, restricoes))
+            for posicao in ('goleiro', 'defensor', 'meio', 'atacante'):
+                contagens = [sum(posicoes[i] == posicao for i in time) for time in times]
+                self.assertLessEqual(max(contagens) - min(contagens), 1)
+            self.assertEqual(sorted(i for time in times for i in time), list(range(total)))
+            self.assertLess(avaliar(notas, times)[0], 0.5)
+
+    def test_informa_o_que_precisou_ser_relaxado(self):
+        # Cinco jogadores separados dois a dois não cabem em quatro times
+        separar = [(a, b) for a in range(5) for b in range(a + 1, 5)]
+        restricoes = Restricoes(separar=separar, juntar=[(6, 7)])
+        times, relaxadas, nao_verificadas = balancear_com_restricoes([5.0] * 12, 4, restricoes)
+        self.assertEqual(relaxadas, [('separar', 3, 4)])
+        self.assertEqual(nao_verificadas, [])
+        self.assertTrue(self._cumpre(times, restricoes.com_pares(
+            [par for par in restricoes.pares() if par not in relaxadas]
+        )))
+
+    def test_prazo_esgotado_nao_conta_como_restricao_impossivel(self):
+        # A busca completa é impossível, mas a partir da quarta chamada o prazo "acaba":
+        # os pares restantes não foram testados e não podem aparecer como relaxados
+        separar = [(a, b) for a in range(5) for b in range(a + 1, 5)]
+        restricoes = Restricoes(separar=separar, juntar=[(6, 7)])
+        resolver = balanceamento._resolver
+        chamadas = []
+
+        def esgota_depois(*args, **kwargs):
+            chamadas.append(args)
+            if len(chamadas) > 3:
+                raise balanceamento._Esgotado
+            return resolver(*args, **kwargs)
+
+        with mock.patch.object(balanceamento, '_resolver', side_effect=esgota_depois):
+            times, relaxadas, nao_verificadas = balancear_com_restricoes([5.0] * 12, 4, restricoes)
+        pares = restricoes.pares()
+        self.assertEqual(relaxadas, [])
+        self.assertEqual(nao_verificadas, pares[1:])
+        self.assertTrue(self._cumpre(times, restricoes.com_pares(pares[:1])))
+
+    def test_sorteio_usa_posicoes_e_pares_do_admin(self):
+        goleiros = [Jogador.objects.create(nome=f'Goleiro {i}', posicao='goleiro') for i in range(4)]
+        jogadores = [Jogador.objects.create(nome=f'Jogador {i}') for i in range(8)]
+        RestricaoPar.objects.create(jogador_a=jogadores[0], jogador_b=jogadores[1], tipo=RestricaoPar.JUNTAR)
+        for outro in goleiros[1:]:
+            RestricaoPar.objects.create(jogador_a=goleiros[0], jogador_b=outro, tipo=RestricaoPar.JUNTAR)
+
+        times = distribuir_times_equilibrados(num_times=4)
+        self.assertTrue(times.restricoes_relaxadas)
+        time_de = {j.pk: t for t, time in enumerate(times) for j in time}
+        self.assertEqual(time_de[jogadores[0].pk], time_de[jogadores[1].pk])
+        self.assertEqual(sorted(time_de[g.pk] for g in goleiros), [0, 1, 2, 3])
+
+        admin = Votante.objects.create_superuser('admin', password='senha-forte-123', nome_completo='Admin')
+        self.client.force_login(admin)
+        self.assertContains(self.client.get(reverse('sortear_times')), 'Não foi possível cumprir todas as restrições')
+
+    def test_destaques_por_posicao_so_separados_quando_ligado(self):
+        atacantes = [Jogador.objects.create(nome=f'Atacante {i}', posicao='atacante') for i in range(6)]
+        jogadores = sorted(atacantes, key=lambda j: j.nome)
+        self.assertEqual(views._restricoes_do_sorteio(jogadores, 4).separar, [])
+        with override_settings(SORTEIO_SEPARAR_DESTAQUES=True):
+            separar = views._restricoes_do_sorteio(jogadores, 4).separar
+        # Os quatro primeiros (maiores notas) dois a dois
+        self.assertEqual(separar, [(a, b) for a in range(4) for b in range(a + 1, 4)])
+
+
+class PainelEventosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Votante.objects.create_superuser('admin', password='senha-forte-123', nome_completo='Admin')
+        cls.votante = Votante.objects.create_user('votante', password='senha-forte-123', nome_completo='Votante')
+        cls.jogador = Jogador.objects.create(nome='Jogador')
+
+    async def _proximo_evento(self, fluxo):
+        while True:
+            bloco = (await anext(fluxo)).decode()
+            if bloco.startswith('data: '):
+                return json.loads(bloco[len('data: '):])
+
+    async def test_envia_todos_os_numeros_e_depois_so_a_diferenca(self):
+        await self.async_client.aforce_login(self.admin)
+        response = await self.async_client.get(reverse('painel_eventos'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        fluxo = aiter(response.streaming_content)
+        try:
+            # Descarta números que outro teste tenha deixado guardados
+            eventos.notificar()
+            self.assertEqual(await self._proximo_evento(fluxo), {
+                'total_votos': 0, 'votos_hoje': 0, 'votantes_ativos_hoje': 0,
+                'total_jogadores': 1, 'total_votantes': 1,
+            })
+            await sync_to_async(Avaliacao.objects.registrar_notas)(self.votante, {self.jogador.pk: 7})
+            # No TestCase o on_commit não roda: avisa como o commit avisaria
+            eventos.notificar()
+            self.assertEqual(
+                await self._proximo_evento(fluxo),
+                {'total_votos': 1, 'votos_hoje': 1, 'votantes_ativos_hoje': 1},
+            )
+        finally:
+            await fluxo.aclose()
+
+    async def test_votante_comum_nao_acessa(self):
+        await self.async_client.aforce_login(self.votante)
+        response = await self.async_client.get(reverse('painel_eventos'))
+        self.assertEqual(response.status_code, 403)
+
+    def test_wsgi_nao_abre_o_stream(self):
+        self.client.force_login(self.admin)
+        self.assertNotContains(self.client.get(reverse('admin_dashboard')), 'EventSource')
+        response = self.client.get(reverse('painel_eventos'))
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(response.streaming)
+
+
+class ExportacaoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Votante.objects.create_superuser('admin', password='senha-forte-123', nome_completo='Admin')
+        cls.votante = Votante.objects.create_user('votante', password='senha-forte-123', nome_completo='Votante')
+        cls.jogadores = [Jogador.objects.create(nome=f'Jogador {i}') for i in range(4)]
+        Avaliacao.objects.registrar_notas(cls.votante, {j.pk: 5 + i for i, j in enumerate(cls.jogadores)})
+        # Metade das notas em uma rodada já arquivada
+        ontem = Rodada.objects.garantir(timezone.localdate() - timedelta(days=1))
+        Avaliacao.objects.filter(jogador__in=cls.jogadores[:2]).update(rodada_id=ontem)
+        Rodada.objects.arquivar()
+
+    def setUp(self):
+        django_cache.clear()
+
+    def _baixar(self, tipo, formato):
+        response = self.client.get(reverse('exportar', args=[tipo, formato]))
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_so_staff_exporta(self):
+        self.client.force_login(self.votante)
+        response = self.client.get(reverse('exportar', args=['avaliacoes', 'csv']))
+        self.assertEqual(response.status_code, 302)
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get(reverse('exportar', args=['votantes', 'csv'])).status_code, 404)
+
+    def test_csv_e_ndjson_em_fluxo(self):
+        self.client.force_login(self.admin)
+        linhas = self._baixar('avaliacoes', 'csv').splitlines()
+        self.assertEqual(linhas[0], 'id,rodada,avaliador,jogador,nota,data_avaliacao,arquivada')
+        self.assertEqual(sorted(linha.split(',')[-1] for linha in linhas[1:]), ['False', 'False', 'True', 'True'])
+
+        jogadores = [json.loads(linha) for linha in self._baixar('jogadores', 'ndjson').splitlines()]
+        self.assertEqual([j['nome'] for j in jogadores], [j.nome for j in self.jogadores])
+        self.assertEqual([j['media'] for j in jogadores], [5, 6, 7, 8])
+
+        times = [json.loads(linha) for linha in self._baixar('times', 'ndjson').splitlines()]
+        self.assertEqual(len(times), 4)
+        self.assertEqual({t['time'] for t in times}, {1, 2, 3, 4})
+
+    async def test_asgi_recebe_gerador_assincrono(self):
+        await self.async_client.aforce_login(self.admin)
+        response = await self.async_client.get(reverse('exportar', args=['jogadores', 'csv']))
+        self.assertTrue(response.is_async)
+        self.assertIn('attachment; filename="jogadores-', response['Content-Disposition'])
+        conteudo = b''.join([pedaco async for pedaco in response.streaming_content]).decode()
+        self.assertEqual(len(conteudo.splitlines()), 5)
+
+    def test_comando_grava_arquivo(self):
+        with tempfile.TemporaryDirectory() as pasta:
+            saida = os.path.join(pasta, 'avaliacoes.ndjson')
+            call_command('exportar_dados', 'avaliacoes', formato='ndjson', saida=saida, lote=1, stdout=StringIO())
+            with open(saida, encoding='utf-8') as arquivo:
+                notas = sorted(json.loads(linha)['nota'] for linha in arquivo)
+        self.assertEqual(notas, [5, 6, 7, 8])
+
+
+class JogadorAdminTests(TestCase):
+    def test_listagem_nao_consulta_por_jogador(self):
+        admin = Votante.objects.create_superuser('admin', password='senha-forte-123', nome_completo='Admin')
+        votante = Votante.objects.create_user('votante', password='senha-forte-123', nome_completo='Votante')
+        jogadores = [Jogador.objects.create(nome=f'Jogador {i:02d}') for i in range(30)]
+        Avaliacao.objects.registrar_notas(votante, {j.pk: i % 11 for i, j in enumerate(jogadores)})
+        self.client.force_login(admin)
+        url = reverse('admin:sorteio_jogador_changelist')
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(url, {'o': '-5'})
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(len(consultas), 10)
+        # Ordenado pela média anotada (5ª coluna), decrescente
+        self.assertEqual(response.context['cl'].result_list[0].media_avaliacoes, 10)
+
+    def _invalidacoes(self, callbacks):
+        return sum(1 for callback in callbacks if callback is cache._incrementar_versao)
+
+    def test_acoes_em_lote_invalidam_uma_vez(self):
+        admin = Votante.objects.create_superuser('admin', password='senha-forte-123', nome_completo='Admin')
+        jogadores = [Jogador.objects.create(nome=f'Jogador {i}') for i in range(5)]
+        self.client.force_login(admin)
+        url = reverse('admin:sorteio_jogador_changelist')
+        selecionados = [j.pk for j in jogadores[:3]]
+
+        with self.captureOnCommitCallbacks() as callbacks, CaptureQueriesContext(connection) as consultas:
+            self.client.post(url, {'action': 'desativar_jogadores', '_selected_action': selecionados})
+        self.assertEqual(self._invalidacoes(callbacks), 1)
+        self.assertEqual(sum(1 for c in consultas if c['sql'].startswith('UPDATE')), 1)
+        self.assertEqual(set(Jogador.objects.filter(ativo=False).values_list('pk', flat=True)), set(selecionados))
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post(url, {'action': 'delete_selected', '_selected_action': selecionados, 'post': 'yes'})
+        self.assertEqual(self._invalidacoes(callbacks), 1)
+        self.assertEqual(Jogador.objects.count(), 2)
+
+    def test_importa_nomes_colados_e_csv(self):
+        admin = Votante.objects.create_superuser('admin', password='senha-forte-123', nome_completo='Admin')
+        Jogador.objects.create(nome='Ana')
+        self.client.force_login(admin)
+        arquivo = SimpleUploadedFile('jogadores.csv', 'id,nome,ativo\n1,Ana,True\n2,Bruno,True\n'.encode())
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(
+                reverse('importar_jogadores'), {'nomes': 'Caio\n\n Duda \nCaio', 'arquivo': arquivo}
+            )
+        self.assertRedirects(response, reverse('listar_jogadores'), fetch_redirect_response=False)
+        self.assertEqual(self._invalidacoes(callbacks), 1)
+        self.assertEqual(sorted(Jogador.objects.values_list('nome', flat=True)), ['Ana', 'Bruno', 'Caio', 'Duda'])
+
+    def test_importacao_simultanea_conta_so_o_que_inseriu(self):
+        # Outro admin cadastrou 'Caio' depois da primeira leitura e antes do INSERT
+        Jogador.objects.create(nome='Caio')
+        leituras = []
+
+        def leitura(queryset, *args, **kwargs):
+            leituras.append(kwargs)
+            resultado = QuerySet.filter(queryset, *args, **kwargs)
+            return resultado.exclude(nome='Caio') if len(leituras) == 1 else resultado
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            with mock.patch('sorteio.models.JogadorQuerySet.filter', autospec=True, side_effect=leitura):
+                criados, existentes = Jogador.objects.importar(['Ana', 'Caio', 'Duda'])
+        self.assertEqual(len(leituras), 2)
+        self.assertEqual((criados, existentes), (['Ana', 'Duda'], ['Caio']))
+        self.assertEqual(self._invalidacoes(callbacks), 1)
+        self.assertEqual(sorted(Jogador.objects.values_list('nome', flat=True)), ['Ana', 'Caio', 'Duda'])
+
+class CopiarSqliteTests(TransactionTestCase):
+    def _preparar_origem(self, caminho):
+        """Migra e popula um SQLite separado num processo próprio, como um db.sqlite3 de produção"""
+        ambiente = {**os.environ, 'DATABASE_URL': f'sqlite:///{caminho}'}
+        manage = [sys.executable, str(settings.BASE_DIR / 'manage.py')]
+        subprocess.run(manage + ['migrate', '-v0'], env=ambiente, check=True)
+        subprocess.run(manage + ['shell', '-v0', '-c', (
+            'from sorteio.models import *\n'
+            'v = Votante.objects.create_user("antigo", password="senha-forte-123")\n'
+            'j = Jogador.objects.create(nome="Ana")\n'
+            'Avaliacao.objects.registrar_notas(v, {j.pk: 7})\n'
+            'Avaliacao.objects.update(data_avaliacao="2024-05-01T12:30:00Z")\n'
+        )], env=ambiente, check=True)
+
+    def test_copia_preservando_ids_datas_e_sequencias(self):
+        Votante.objects.create_user('so-no-destino', password='senha-forte-123')
+        with tempfile.TemporaryDirectory() as diretorio:
+            origem = os.path.join(diretorio, 'origem.sqlite3')
+            self._preparar_origem(origem)
+            call_command('copiar_sqlite', origem=origem, lote=1, stdout=StringIO())
+
+        votante = Votante.objects.get()
+        self.assertEqual(votante.username, 'antigo')
+        self.assertTrue(votante.check_password('senha-forte-123'))
+        avaliacao = Avaliacao.objects.select_related('jogador').get()
+        self.assertEqual((avaliacao.avaliador_id, avaliacao.jogador.nome, avaliacao.nota), (votante.pk, 'Ana', 7))
+        self.assertEqual(avaliacao.data_avaliacao, datetime(2024, 5, 1, 12, 30, tzinfo=dt_timezone.utc))
+        self.assertGreater(Jogador.objects.create(nome='Bia').pk, avaliacao.jogador_id)
+
+
+class ServirEstaticosTests(TestCase):
+    CSS = 'body { margin: 0; }\n' * 200
+
+    def setUp(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        origem = os.path.join(diretorio.name, 'origem')
+        os.makedirs(os.path.join(origem, 'css'))
+        with open(os.path.join(origem, 'css', 'site.css'), 'w') as arquivo:
+            arquivo.write(self.CSS)
+        configuracao = override_settings(
+            STATIC_ROOT=os.path.join(diretorio.name, 'staticfiles'),
+            STATICFILES_DIRS=[origem],
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+        )
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    def test_arquivo_com_hash_sai_comprimido_e_imutavel_sem_consultas(self):
+        url = static('css/site.css')
+        self.assertNotEqual(url, '/static/css/site.css')
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)).decode(), self.CSS)
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_nome_original_sem_compressao_e_arquivo_inexistente(self):
+        response = self.client.get('/static/css/site.css')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=60')
+        self.assertEqual(b''.join(response.streaming_content).decode(), self.CSS)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/static/css/nada.css').status_code, 404)
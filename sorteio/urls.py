@@ -10,11 +10,15 @@ urlpatterns = [
     
     # Páginas para votantes
     path('votar/', views.votar, name='votar'),
+    path('votar/todos/', views.votar_todos, name='votar_todos'),
     path('parcial/', views.parcial_times, name='parcial_times'),
     
     # Páginas para admin
     path('admin-dashboard/', views.admin_dashboard, name='admin_dashboard'),
+    path('admin-dashboard/eventos/', views.painel_eventos, name='painel_eventos'),
+    path('admin-dashboard/exportar/<slug:tipo>.<slug:formato>', views.exportar, name='exportar'),
     path('cadastrar-jogador/', views.cadastrar_jogador, name='cadastrar_jogador'),
+    path('importar-jogadores/', views.importar_jogadores, name='importar_jogadores'),
     path('listar-jogadores/', views.listar_jogadores, name='listar_jogadores'),
     path('sortear-times/', views.sortear_times, name='sortear_times'),
 ]
\ No newline at end of file
@@ -1,14 +1,29 @@
-from django.shortcuts import render, redirect, get_object_or_404
+import logging
+from datetime import datetime, timezone as dt_timezone
+
+from django.shortcuts import render, redirect
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.admin.views.decorators import staff_member_required
-from django.db.models import Avg, Count
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 from django.db import IntegrityError
+from django.db.models import F
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, HttpResponseForbidden, StreamingHttpResponse
 from django.contrib import messages
-from django.utils import timezone
-from .models import Votante, Jogador, Avaliacao
-from .forms import CadastroVotanteForm, LoginForm, CadastroJogadorForm, AvaliacaoForm
-import random
+from .models import (
+    Jogador, Avaliacao, EstatisticaDiaria, EstatisticaJogador, RestricaoPar, intervalo_do_dia,
+)
+from .forms import (
+    CadastroVotanteForm, LoginForm, CadastroJogadorForm, ImportarJogadoresForm, AvaliacaoJogadorForm,
+    AvaliacaoLoteFormSet,
+)
+from .balanceamento import Opcoes, Restricoes, alternativas, balancear, balancear_com_restricoes
+from . import cache, eventos, exportacao
+
+logger = logging.getLogger(__name__)
 
 def home(request):
     """View para a página inicial"""
@@ -77,60 +92,122 @@ def votar(request):
     if request.user.is_superuser:
         return redirect('admin_dashboard')
     
-    # Verificar se já votou em todos os jogadores hoje
-    if request.user.votou_em_todos_jogadores_hoje():
-        return redirect('parcial_times')
-    
-    # Pegar jogadores que ainda não foram avaliados pelo usuário hoje
-    jogadores_avaliados_hoje = Avaliacao.objects.filter(
-        avaliador=request.user,
-        data_avaliacao__date=timezone.now().date()
-    ).values_list('jogador_id', flat=True)
-    
-    jogadores_restantes = Jogador.objects.filter(
-        ativo=True
-    ).exclude(id__in=jogadores_avaliados_hoje).order_by('nome')
+    # Próximo jogador, progresso e contagens vêm de uma única consulta
+    progresso = request.user.progresso_hoje()
     
     # Se não há jogadores restantes, redirecionar para parcial
-    if not jogadores_restantes.exists():
+    if progresso.concluido:
         return redirect('parcial_times')
     
-    # Pegar o primeiro jogador para avaliar
-    jogador = jogadores_restantes.first()
+    jogador = progresso.proximo
     
     if request.method == 'POST':
-        form = AvaliacaoForm(request.POST)
+        form = AvaliacaoJogadorForm(request.POST)
         if form.is_valid():
-            avaliacao = form.save(commit=False)
-            avaliacao.avaliador = request.user
-            avaliacao.jogador = jogador
-            avaliacao.save()
-            
-            messages.success(request, f'Nota {avaliacao.nota} atribuída para {jogador.nome}!')
-            return redirect('votar')
+            # O jogador vem do formulário: um duplo clique regrava a mesma nota
+            # em vez de atribuí-la ao próximo jogador da fila
+            avaliado = next((j for j in progresso.jogadores if j.pk == form.cleaned_data['jogador']), None)
+            if avaliado is None:
+                form.add_error(None, 'Jogador inválido.')
+            else:
+                nota = form.cleaned_data['nota']
+                Avaliacao.objects.registrar_notas(request.user, {avaliado.pk: nota})
+                messages.success(request, f'Nota {nota} atribuída para {avaliado.nome}!')
+                return redirect('votar')
     else:
-        form = AvaliacaoForm()
-    
-    # Calcular progresso
-    total_jogadores = Jogador.objects.filter(ativo=True).count()
-    avaliacoes_feitas = Avaliacao.objects.filter(
-        avaliador=request.user,
-        data_avaliacao__date=timezone.now().date()
-    ).count()
-    
-    progresso = (avaliacoes_feitas / total_jogadores) * 100 if total_jogadores > 0 else 0
+        form = AvaliacaoJogadorForm(initial={'jogador': jogador.pk})
     
     context = {
         'jogador': jogador,
         'form': form,
-        'progresso': progresso,
-        'avaliacoes_feitas': avaliacoes_feitas,
-        'total_jogadores': total_jogadores,
-        'jogadores_restantes': jogadores_restantes.count()
+        'progresso': progresso.percentual,
+        'avaliacoes_feitas': progresso.avaliacoes_feitas,
+        'total_jogadores': progresso.total_jogadores,
+        'jogadores_restantes': progresso.jogadores_restantes,
     }
     return render(request, 'votar.html', context)
 
 @login_required
+def votar_todos(request):
+    """Avaliação de todos os jogadores restantes em uma única página"""
+    if request.user.is_superuser:
+        return redirect('admin_dashboard')
+    
+    progresso = request.user.progresso_hoje()
+    if progresso.concluido:
+        return redirect('parcial_times')
+    
+    restantes = [j for j in progresso.jogadores if not j.avaliado_hoje]
+    
+    if request.method == 'POST':
+        formset = AvaliacaoLoteFormSet(request.POST, avaliador=request.user, jogadores=restantes)
+        if formset.is_valid():
+            avaliacoes = formset.save()
+            messages.success(request, f'{len(avaliacoes)} notas registradas!')
+            return redirect('parcial_times')
+    else:
+        formset = AvaliacaoLoteFormSet(avaliador=request.user, jogadores=restantes)
+    
+    context = {
+        'formset': formset,
+        'progresso': progresso.percentual,
+        'jogadores_restantes': progresso.jogadores_restantes,
+    }
+    return render(request, 'votar_lote.html', context)
+
+def _pode_ver(request):
+    """Se a página vai ser mostrada a este usuário, e não trocada por um redirecionamento.
+
+    Só então ela ganha ETag e Last-Modified: senão uma revalidação condicional
+    receberia 304 no lugar do redirecionamento. A trava do parcial (votou em
+    todos hoje) fica no cache da versão das notas, então o 304 continua sem
+    consultar o banco.
+    """
+    usuario = request.user
+    if not usuario.is_authenticated:
+        return False
+    if request.resolver_match.url_name != 'parcial_times':
+        return usuario.is_active and usuario.is_staff
+    if usuario.is_superuser:
+        return False
+    return cache.obter(
+        'votou-hoje', usuario.votou_em_todos_jogadores_hoje, usuario.pk, intervalo_do_dia()[0].date(),
+    )
+
+def _etag_notas(request, *args, **kwargs):
+    """ETag das páginas derivadas das notas, sem calcular nada.
+
+    Muda a cada voto ou alteração de jogador (versão das notas), na virada do
+    dia (a trava do parcial depende dos votos de hoje), com o usuário e com a
+    configuração do sorteio.
+    """
+    if not _pode_ver(request):
+        return None
+    return '-'.join(str(parte) for parte in (
+        request.resolver_match.url_name, request.user.pk, cache.versao_notas(),
+        intervalo_do_dia()[0].date(), settings.SORTEIO_NUM_TIMES, settings.SORTEIO_ESTRATEGIA,
+        getattr(settings, 'SORTEIO_NOTA', 'media'), getattr(settings, 'SORTEIO_MEIA_VIDA_DIAS', 90),
+        getattr(settings, 'SORTEIO_PERCENTUAL_CORTE', 10),
+        request.GET.urlencode(),
+    ))
+
+def _ultima_modificacao_notas(request, *args, **kwargs):
+    """Última alteração das notas, nunca antes do início do dia"""
+    if not _pode_ver(request):
+        return None
+    inicio_do_dia = intervalo_do_dia()[0]
+    modificado_em = cache.modificado_em()
+    if modificado_em is None:
+        return inicio_do_dia
+    return max(datetime.fromtimestamp(modificado_em, tz=dt_timezone.utc), inicio_do_dia)
+
+# Recargas sem mudança respondem 304 antes de qualquer consulta às notas
+resposta_condicional = condition(etag_func=_etag_notas, last_modified_func=_ultima_modificacao_notas)
+revalidar_sempre = cache_control(private=True, no_cache=True)
+
+@login_required
+@revalidar_sempre
+@resposta_condicional
 def parcial_times(request):
     """Mostrar parcial dos times - só para quem já votou"""
     if request.user.is_superuser:
@@ -141,7 +218,7 @@ def parcial_times(request):
         messages.warning(request, 'Você precisa votar em todos os jogadores para ver o parcial.')
         return redirect('votar')
     
-    times = distribuir_times_equilibrados()
+    times = cache.obter('times', distribuir_times_equilibrados)
     
     context = {
         'times': times,
@@ -152,26 +229,53 @@ def parcial_times(request):
 @staff_member_required
 def admin_dashboard(request):
     """Dashboard do administrador"""
-    total_jogadores = Jogador.objects.filter(ativo=True).count()
-    total_votantes = Votante.objects.filter(is_superuser=False).count()
-    total_votos = Avaliacao.objects.count()
+    hoje = intervalo_do_dia()
     
-    # Estatísticas de hoje
-    hoje = timezone.now().date()
-    votos_hoje = Avaliacao.objects.filter(data_avaliacao__date=hoje).count()
-    votantes_ativos_hoje = Avaliacao.objects.filter(
-        data_avaliacao__date=hoje
-    ).values('avaliador').distinct().count()
+    # Na virada do dia, o primeiro acesso consolida o resumo dos dias já fechados.
+    # Arquivar as rodadas move linhas e fica com o comando arquivar_rodadas (cron)
+    consolidacao = f'consolidacao:{hoje[0].date()}'
+    if cache.primeira_vez(consolidacao):
+        try:
+            EstatisticaDiaria.objects.consolidar()
+        except Exception:
+            # Sem a marca do dia, o próximo acesso tenta de novo
+            cache.esquecer(consolidacao)
+            raise
     
-    context = {
-        'total_jogadores': total_jogadores,
-        'total_votantes': total_votantes,
-        'total_votos': total_votos,
-        'votos_hoje': votos_hoje,
-        'votantes_ativos_hoje': votantes_ativos_hoje,
-    }
+    # Todos os números ao vivo em uma única consulta; depois a página os recebe por SSE
+    context = Avaliacao.objects.numeros_do_painel(hoje)
+    # Histórico lido do resumo diário, sem varrer as avaliações
+    context['historico'] = EstatisticaDiaria.objects.all()[:14]
+    context['exportacoes'] = [('avaliacoes', 'Avaliações'), ('jogadores', 'Jogadores'), ('times', 'Times')]
+    # Números ao vivo só quando servido por ASGI (ver painel_eventos)
+    context['ao_vivo'] = isinstance(request, ASGIRequest)
     return render(request, 'admin_dashboard.html', context)
 
+async def painel_eventos(request):
+    """Stream SSE com os números do dashboard, enviados de novo só quando mudam"""
+    user = await request.auser()
+    if not user.is_staff:
+        return HttpResponseForbidden()
+    if not isinstance(request, ASGIRequest):
+        # No WSGI o fluxo sem fim seria lido inteiro antes do envio, prendendo um
+        # worker; 204 faz o EventSource parar de reconectar
+        return HttpResponse(status=204)
+    response = StreamingHttpResponse(
+        eventos.fluxo(Avaliacao.objects.numeros_do_painel),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Proxies como o nginx não devem segurar os eventos em buffer
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+@staff_member_required
+def exportar(request, tipo, formato):
+    """Admin baixa notas, jogadores ou o sorteio atual em CSV ou NDJSON, em fluxo"""
+    if tipo not in exportacao.EXPORTACOES or formato not in exportacao.FORMATOS:
+        raise Http404
+    return exportacao.resposta(request, tipo, formato)
+
 @staff_member_required
 def cadastrar_jogador(request):
     """Admin cadastra novos jogadores"""
@@ -187,12 +291,27 @@ def cadastrar_jogador(request):
     return render(request, 'cadastrar_jogador.html', {'form': form})
 
 @staff_member_required
+def importar_jogadores(request):
+    """Admin cadastra vários jogadores de uma vez (texto colado ou CSV)"""
+    if request.method == 'POST':
+        form = ImportarJogadoresForm(request.POST, request.FILES)
+        if form.is_valid():
+            criados, existentes = form.save()
+            messages.success(request, f'Jogadores cadastrados: {len(criados)}.')
+            if existentes:
+                messages.info(request, f'Já cadastrados: {", ".join(existentes)}.')
+            return redirect('listar_jogadores')
+    else:
+        form = ImportarJogadoresForm()
+    
+    return render(request, 'importar_jogadores.html', {'form': form})
+
+@staff_member_required
+@revalidar_sempre
+@resposta_condicional
 def listar_jogadores(request):
     """Admin lista todos os jogadores"""
-    jogadores = Jogador.objects.filter(ativo=True).annotate(
-        count_votos=Count('avaliacoes_recebidas'),
-        avg_notas=Avg('avaliacoes_recebidas__nota')
-    ).order_by('nome')
+    jogadores = Jogador.objects.filter(ativo=True).com_medias().order_by('nome')
     
     context = {
         'jogadores': jogadores,
@@ -200,53 +319,98 @@ def listar_jogadores(request):
     return render(request, 'listar_jogadores.html', context)
 
 @staff_member_required
+@revalidar_sempre
+@resposta_condicional
 def sortear_times(request):
-    """Admin visualiza times sorteados finais"""
-    times = distribuir_times_equilibrados()
+    """Admin visualiza times sorteados finais (ou, com ?opcoes=K, as K melhores alternativas)"""
+    try:
+        num_opcoes = min(int(request.GET.get('opcoes', 0)), MAXIMO_OPCOES)
+        semente = int(request.GET.get('semente', 0))
+    except ValueError:
+        num_opcoes, semente = 0, 0
     
-    context = {
-        'times': times,
-        'parcial': False,
-    }
+    context = {'parcial': False}
+    if num_opcoes > 0:
+        context['opcoes'] = cache.obter('opcoes', lambda: sortear_opcoes(num_opcoes, semente), num_opcoes, semente)
+        context['semente'] = semente
+        context['num_opcoes'] = num_opcoes
+    else:
+        context['times'] = cache.obter('times', distribuir_times_equilibrados)
     return render(request, 'times_sorteados.html', context)
 
-def distribuir_times_equilibrados():
-    """Distribui 24 jogadores em 4 times de 6, de forma equilibrada"""
-    # Pegar jogadores com suas médias
-    jogadores = list(Jogador.objects.filter(ativo=True).annotate(
-        media_notas=Avg('avaliacoes_recebidas__nota')
-    ).order_by('-media_notas'))
-    
-    if len(jogadores) < 24:
-        # Se não tem 24 jogadores, distribuir proporcionalmente
-        times_count = 4
-        por_time = len(jogadores) // times_count
-        extras = len(jogadores) % times_count
-    else:
-        por_time = 6
-        extras = 0
-    
-    # Criar 4 times vazios
-    times = [[] for _ in range(4)]
-    
-    # Algoritmo de distribuição em serpentina para equilibrar
-    for i, jogador in enumerate(jogadores):
-        # Determinar qual time recebe o jogador
-        ciclo = i // 4
-        if ciclo % 2 == 0:
-            # Ida: 0, 1, 2, 3
-            time_index = i % 4
+# Nota usada no sorteio: média simples de todas as notas ou média com decaimento
+CRITERIOS_NOTA = {'media': 'media_notas', 'recente': 'media_recente'}
+# ... ou uma agregação robusta a votos extremos (ver EstatisticaJogador.objects.medias_robustas)
+CRITERIOS_ROBUSTOS = ('aparada', 'mediana', 'winsorizada')
+# ... ou corrigida pelo viés de cada votante (ver sorteio.normalizacao)
+CRITERIOS_NORMALIZADOS = ('zscore', 'vies')
+MAXIMO_OPCOES = 10
+
+def _jogadores_do_sorteio(criterio=None):
+    """Jogadores ativos com a nota do critério em nota_sorteio, da maior para a menor"""
+    criterio = criterio or getattr(settings, 'SORTEIO_NOTA', 'media')
+    if criterio in CRITERIOS_ROBUSTOS or criterio in CRITERIOS_NORMALIZADOS:
+        if criterio in CRITERIOS_ROBUSTOS:
+            # Agregação robusta calculada no banco sobre as notas brutas
+            notas = EstatisticaJogador.objects.medias_robustas(
+                criterio, getattr(settings, 'SORTEIO_PERCENTUAL_CORTE', 10)
+            )
         else:
-            # Volta: 3, 2, 1, 0
-            time_index = 3 - (i % 4)
-        
-        times[time_index].append(jogador)
-    
+            from .normalizacao import forcas_normalizadas
+
+            notas = forcas_normalizadas(criterio)
+        jogadores = list(Jogador.objects.filter(ativo=True).com_medias().order_by('nome'))
+        for jogador in jogadores:
+            jogador.nota_sorteio = notas.get(jogador.pk, 0)
+        jogadores.sort(key=lambda j: -j.nota_sorteio)
+        return jogadores
+    campo = CRITERIOS_NOTA[criterio]
+    jogadores = list(Jogador.objects.filter(ativo=True).com_medias().order_by(F(campo).desc(nulls_last=True)))
+    for jogador in jogadores:
+        jogador.nota_sorteio = getattr(jogador, campo) or 0
+    return jogadores
+
+def _restricoes_do_sorteio(jogadores, num_times):
+    """Posições e pares entre os jogadores do sorteio, pelos índices na lista.
+
+    Com SORTEIO_SEPARAR_DESTAQUES ligado, os num_times melhores de cada posição
+    também vão para times diferentes, depois dos pares do admin para serem os
+    primeiros relaxados se preciso.
+    """
+    indice = {j.pk: i for i, j in enumerate(jogadores)}
+    separar, juntar = [], []
+    for restricao in RestricaoPar.objects.filter(jogador_a__in=indice, jogador_b__in=indice):
+        par = (indice[restricao.jogador_a_id], indice[restricao.jogador_b_id])
+        (juntar if restricao.tipo == RestricaoPar.JUNTAR else separar).append(par)
+    if getattr(settings, 'SORTEIO_SEPARAR_DESTAQUES', False):
+        por_posicao = {}
+        # A lista já vem da maior para a menor nota
+        for i, jogador in enumerate(jogadores):
+            if jogador.posicao:
+                por_posicao.setdefault(jogador.posicao, []).append(i)
+        for indices in por_posicao.values():
+            destaques = indices[:num_times]
+            separar += [(a, b) for n, a in enumerate(destaques) for b in destaques[n + 1:]]
+    return Restricoes([j.posicao for j in jogadores], separar, juntar)
+
+def _descrever_relaxadas(jogadores, relaxadas):
+    descricoes = []
+    for tipo, a, b in relaxadas:
+        if tipo == 'posicoes':
+            descricoes.append('Posições espalhadas entre os times')
+        elif tipo == 'juntar':
+            descricoes.append(f'{jogadores[a].nome} e {jogadores[b].nome} no mesmo time')
+        else:
+            descricoes.append(f'{jogadores[a].nome} e {jogadores[b].nome} em times diferentes')
+    return descricoes
+
+def _montar_times(jogadores, indices_por_time):
     # Calcular médias dos times
     times_com_media = []
-    for i, time in enumerate(times):
+    for indices in indices_por_time:
+        time = [jogadores[i] for i in sorted(indices)]
         if time:
-            media_time = sum(j.media_notas or 0 for j in time) / len(time)
+            media_time = sum(j.nota_sorteio for j in time) / len(time)
         else:
             media_time = 0.0
         
@@ -254,6 +418,60 @@ def distribuir_times_equilibrados():
     
     return times_com_media
 
+def distribuir_times_equilibrados(num_times=None, estrategia=None, criterio=None):
+    """Distribui os jogadores ativos em times equilibrados pela nota do critério escolhido.
+
+    Com posições ou pares cadastrados, usa o sorteio com restrições no lugar da
+    estratégia; as restrições que não puderam ser cumpridas vêm em
+    restricoes_relaxadas do resultado, e as que o prazo não deixou verificar em
+    restricoes_nao_verificadas.
+    """
+    num_times = num_times or getattr(settings, 'SORTEIO_NUM_TIMES', 4)
+    estrategia = estrategia or getattr(settings, 'SORTEIO_ESTRATEGIA', 'guloso')
+    
+    jogadores = _jogadores_do_sorteio(criterio)
+    notas = [j.nota_sorteio for j in jogadores]
+    restricoes = _restricoes_do_sorteio(jogadores, num_times)
+    if restricoes:
+        logger.info('Sorteio com restrições (posições ou pares): estratégia %r ignorada', estrategia)
+        indices_por_time, relaxadas, nao_verificadas = balancear_com_restricoes(
+            notas, num_times, restricoes, getattr(settings, 'SORTEIO_RESTRICOES_TEMPO', 1.0)
+        )
+        return Sorteio(
+            _montar_times(jogadores, indices_por_time),
+            _descrever_relaxadas(jogadores, relaxadas),
+            _descrever_relaxadas(jogadores, nao_verificadas),
+        )
+    return Sorteio(_montar_times(jogadores, balancear(notas, num_times, estrategia)))
+
+def sortear_opcoes(num_opcoes, semente=0, num_times=None, criterio=None):
+    """As melhores divisões alternativas, cada uma como (diferença entre médias, times).
+
+    Buscas com inícios aleatórios em paralelo (ver balanceamento.alternativas);
+    a mesma semente repete as opções, a menos que o prazo de segurança
+    SORTEIO_OPCOES_TEMPO corte tentativas (opcoes.completas fica False).
+    """
+    num_times = num_times or getattr(settings, 'SORTEIO_NUM_TIMES', 4)
+    jogadores = _jogadores_do_sorteio(criterio)
+    opcoes = alternativas(
+        [j.nota_sorteio for j in jogadores],
+        num_times,
+        k=num_opcoes,
+        tentativas=getattr(settings, 'SORTEIO_OPCOES_TENTATIVAS', 64),
+        semente=semente,
+        tempo_limite=getattr(settings, 'SORTEIO_OPCOES_TEMPO', 2.0),
+        processos=getattr(settings, 'SORTEIO_OPCOES_PROCESSOS', None),
+        restricoes=_restricoes_do_sorteio(jogadores, num_times),
+    )
+    return Opcoes([(diferenca, _montar_times(jogadores, times)) for diferenca, times in opcoes], opcoes.completas)
+
+class Sorteio(list):
+    """Times sorteados, com as restrições relaxadas e as não verificadas a tempo (textos)"""
+    def __init__(self, times, restricoes_relaxadas=(), restricoes_nao_verificadas=()):
+        super().__init__(times)
+        self.restricoes_relaxadas = list(restricoes_relaxadas)
+        self.restricoes_nao_verificadas = list(restricoes_nao_verificadas)
+
 class TimeComMedia:
     """Classe auxiliar para representar um time com sua média"""
     def __init__(self, jogadores, media):